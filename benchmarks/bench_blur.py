@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Blur-check latency and agreement: full-resolution decode vs. one DCT-scaled decode.
+
+Usage:
+    python benchmarks/bench_blur.py [folder] [--repeat N]
+
+Without a folder synthetic 12 MP JPEGs are generated in a temp dir, with
+blur levels on both sides of the threshold, plus noisy low-texture photos
+whose reduced decode scores far below the full one. Prints per-image
+latency of the blur check alone and of the blur check plus perceptual
+hash (which used to decode the photo a second time), the Laplacian scores
+of both paths, and how many keep/reject decisions of blur_check differ
+from the full-decode check it replaced; the script fails if any do.
+"""
+
+import io
+import os
+import sys
+import argparse
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+from src.pixPicker import PHOTO_EXTS, BLUR_THRESHOLD, BLUR_MAX_SIDE, BLUR_RECHECK_MARGIN, blur_check
+from utils.dedupHelper import perceptual_hash
+
+# Gaussian blur radii cycled through the synthetic photos, from sharp to clearly blurry
+SYNTHETIC_BLURS = (0, 1, 2, 3, 4, 6, 8, 12)
+# Sensor noise levels (standard deviation) of the low-texture photos
+SYNTHETIC_NOISE = (2, 3, 4, 8)
+
+
+def make_synthetic_jpegs(folder, count=16, size=(4032, 3024)):
+    """Write JPEGs of blocky noise at several block sizes and blur radii."""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        block = (4, 8, 32)[i % 3]
+        pixels = rng.integers(0, 256, (size[1] // block, size[0] // block, 3), dtype=np.uint8)
+        img = Image.fromarray(pixels).resize(size, Image.NEAREST)
+        radius = SYNTHETIC_BLURS[i % len(SYNTHETIC_BLURS)]
+        if radius:
+            img = img.filter(ImageFilter.GaussianBlur(radius))
+        path = os.path.join(folder, f"synthetic_{i}_block{block}_blur{radius}.jpg")
+        img.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def make_noisy_jpegs(folder, count=8, size=(4032, 3024)):
+    """Write JPEGs of smooth, out-of-focus scenes with sensor noise.
+
+    The noise is most of what the full decode's Laplacian sees, and the
+    DCT-reduced decode averages it away, so their scores differ the most.
+    """
+    rng = np.random.default_rng(1)
+    paths = []
+    for i in range(count):
+        cells = rng.integers(0, 256, (size[1] // 64, size[0] // 64), dtype=np.uint8)
+        base = np.asarray(Image.fromarray(cells).resize(size, Image.BILINEAR), dtype=np.float32)
+        noise = SYNTHETIC_NOISE[i % len(SYNTHETIC_NOISE)]
+        pixels = base[..., None] + rng.normal(0, noise, (size[1], size[0], 3)).astype(np.float32)
+        path = os.path.join(folder, f"noisy_{i}_sigma{noise}.jpg")
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def check_full(data):
+    """(score, blurry) the way the blur check worked before reduced decoding."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    height, width = image.shape
+    scale = min(1.0, BLUR_MAX_SIDE / height, BLUR_MAX_SIDE / width)
+    if scale < 1:
+        image = cv2.resize(image, (int(width * scale), int(height * scale)))
+    score = cv2.Laplacian(image, cv2.CV_64F).var()
+    return score, score < BLUR_THRESHOLD
+
+
+def check_reduced(data):
+    return blur_check(data)[:2]
+
+
+def analyze_full(data):
+    """Blur check and hash as ingestion did before: two decodes of the same file."""
+    result = check_full(data)
+    with Image.open(io.BytesIO(data)) as img:
+        perceptual_hash(img)
+    return result
+
+
+def analyze_reduced(data):
+    """Blur check and hash from one shared DCT-scaled decode, as analyze_photo does."""
+    sharpness, blurry, gray = blur_check(data)
+    perceptual_hash(gray)
+    return sharpness, blurry
+
+
+def time_it(func, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the blur check")
+    parser.add_argument("folder", nargs="?", help="Folder of JPEG/PNG photos")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per image (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.folder:
+            paths = [os.path.join(args.folder, f) for f in sorted(os.listdir(args.folder))
+                     if f.lower().endswith(PHOTO_EXTS) and not f.lower().endswith((".heic", ".heif"))]
+        else:
+            paths = make_synthetic_jpegs(temp_dir) + make_noisy_jpegs(temp_dir)
+
+        totals = np.zeros(4)
+        mismatches = rechecked = rejected = 0
+        print(f"{'file':<32} {'full ms':>8} {'reduced ms':>10} {'+hash ms':>9} {'shared ms':>9} "
+              f"{'full var':>10} {'reduced var':>11}  decision")
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            t_full, (s_full, blurry_full) = time_it(check_full, data, args.repeat)
+            t_reduced, (s_reduced, blurry_reduced) = time_it(check_reduced, data, args.repeat)
+            t_full_hash, _ = time_it(analyze_full, data, args.repeat)
+            t_shared, _ = time_it(analyze_reduced, data, args.repeat)
+            totals += (t_full, t_reduced, t_full_hash, t_shared)
+            rejected += blurry_full
+            rechecked += s_reduced < BLUR_THRESHOLD * BLUR_RECHECK_MARGIN  # judged on a full decode too
+            decision = "reject" if blurry_reduced else "keep"
+            if blurry_full != blurry_reduced:
+                mismatches += 1
+                decision += f" (full decode: {'reject' if blurry_full else 'keep'})"
+            print(f"{os.path.basename(path)[:32]:<32} {t_full * 1000:8.1f} {t_reduced * 1000:10.1f} "
+                  f"{t_full_hash * 1000:9.1f} {t_shared * 1000:9.1f} {s_full:10.1f} {s_reduced:11.1f}  {decision}")
+
+        if paths:
+            n = len(paths)
+            full, reduced, full_hash, shared = totals / n * 1000
+            print(f"\nMean blur check: full {full:.1f} ms, reduced {reduced:.1f} ms "
+                  f"({full / max(reduced, 1e-9):.2f}x faster)")
+            print(f"Mean blur check + hash: two decodes {full_hash:.1f} ms, one shared decode {shared:.1f} ms "
+                  f"({full_hash / max(shared, 1e-9):.2f}x faster)")
+            print(f"Rejected as blurry by the full decode: {rejected}/{n}; "
+                  f"re-checked at full size after the reduced decode: {rechecked}/{n}")
+            print(f"Keep/reject decisions that differ from the full decode at threshold {BLUR_THRESHOLD}: "
+                  f"{mismatches}/{n}")
+        assert mismatches == 0, f"blur_check disagrees with the full-decode check on {mismatches} photos"
+
+
+if __name__ == "__main__":
+    main()
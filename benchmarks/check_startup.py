@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Import-time regression check for the CLI.
+
+Usage:
+    python benchmarks/check_startup.py [--budget-ms 200] [--runs 5]
+
+Fails (exit status 1) when `vblogger_main.py --list-configs` takes longer
+than the budget (median wall time of fresh interpreters, interpreter
+startup included), or when listing configs or loading and planning a
+config imports any of the heavy media modules.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay out of the non-render commands
+HEAVY_MODULES = ("moviepy", "cv2", "PIL", "numpy", "piexif", "imageio", "imageio_ffmpeg",
+                 "imagehash", "exifread", "hachoir", "pillow_heif")
+
+# Runs in a fresh interpreter: the light CLI paths, then reports what got imported
+PROBE = """
+import sys, io, json, contextlib
+sys.argv = ["vblogger_main.py", "--list-configs"]
+import vblogger_main
+with contextlib.redirect_stdout(io.StringIO()):
+    vblogger_main.main()
+from config.config_loader import load_config, list_available_configs
+from src.timeline import render_settings, timeline_duration
+for name in list_available_configs():
+    config = load_config(name)
+    timeline_duration([], render_settings(config, preview=True))
+heavy = %r
+print(json.dumps(sorted({m.split(".")[0] for m in sys.modules} & set(heavy))))
+"""
+
+
+def heavy_imports():
+    result = subprocess.run([sys.executable, "-c", PROBE % (HEAVY_MODULES,)], cwd=PROJECT_ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+
+def list_configs_ms(runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "vblogger_main.py", "--list-configs"], cwd=PROJECT_ROOT,
+                       stdout=subprocess.DEVNULL, check=True)
+        timings.append(1000 * (time.perf_counter() - start))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VBlogger CLI startup check")
+    parser.add_argument("--budget-ms", type=float, default=200.0, help="Allowed median --list-configs time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    args = parser.parse_args()
+
+    failed = False
+    heavy = heavy_imports()
+    if heavy:
+        print(f"FAIL: light commands imported {', '.join(heavy)} "
+              f"(see `python -X importtime vblogger_main.py --list-configs`)")
+        failed = True
+    else:
+        print("OK: light commands import no media modules")
+
+    median = list_configs_ms(args.runs)
+    if median > args.budget_ms:
+        print(f"FAIL: --list-configs took {median:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        failed = True
+    else:
+        print(f"OK: --list-configs took {median:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Stage benchmarks on deterministic synthetic media.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--photos N] [--videos N] [--output results.json]
+                                        [--compare old.json] [--skip-render] [--full-size]
+
+Generates an input library offline (benchmarks/synthetic_media.py), then
+times process_media, is_blurry, group_by_time, create_media_clips and
+build_video separately. Results are written as JSON; --compare prints the
+ratio of every timing against an earlier result file, e.g. one produced by
+the previous vblogger version.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.synthetic_media import generate_library, synthetic_items
+from src import __version__
+from src.pixPicker import process_media, is_blurry, group_by_time, segment_items
+from src.composer import RenderSettings, create_media_clips, build_video
+
+PLANNING_ITEMS = 100_000  # group_by_time is also timed at archive scale on in-memory items
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return result.stdout.decode().strip() or None
+    except OSError:
+        return None
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_process_media(folder, jobs):
+    segments, elapsed = timed(process_media, folder, jobs=jobs, cache_dir=None)
+    files = len(os.listdir(folder))
+    return segments, {"seconds": elapsed, "files": files, "files_per_second": files / elapsed}
+
+
+def bench_is_blurry(photos):
+    timings = []
+    for path in photos:
+        _, elapsed = timed(is_blurry, path)
+        timings.append(elapsed)
+    return {"images": len(timings), "mean_ms": 1000 * sum(timings) / len(timings),
+            "max_ms": 1000 * max(timings)}
+
+
+def bench_group_by_time(segments):
+    items = sorted((item for segment in segments for item in segment), key=lambda x: x["timestamp"])
+    _, small = timed(group_by_time, items)
+    archive = synthetic_items(PLANNING_ITEMS)
+    _, large = timed(group_by_time, archive)
+    # Sorting included, from an order unrelated to time
+    shuffled = sorted(archive, key=lambda x: x["file"][::-1])
+    _, planned = timed(segment_items, shuffled)
+    return {"library_items": len(items), "library_ms": 1000 * small,
+            "archive_items": len(archive), "archive_ms": 1000 * large, "archive_sort_ms": 1000 * planned}
+
+
+def bench_create_media_clips(segments, settings):
+    clips, elapsed = timed(create_media_clips, segments, settings)
+    for clip in clips:
+        clip.close()
+    return {"clips": len(clips), "seconds": elapsed}
+
+
+def bench_build_video(segments, settings, output_file, jobs):
+    video_seconds, elapsed, _ = build_video(segments, output_file, "Benchmark", "Synthetic media",
+                                            jobs=jobs, settings=settings)
+    return {"video_seconds": video_seconds, "wall_seconds": elapsed,
+            "video_seconds_per_wall_second": video_seconds / elapsed, "jobs": jobs,
+            "size": list(settings.size), "fps": settings.fps}
+
+
+def flatten(results, prefix=""):
+    """{"stage.metric": value} for every numeric timing in a results dict."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, previous_file):
+    with open(previous_file, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    old, new = flatten(previous["stages"]), flatten(current["stages"])
+    print(f"\nCompared with {previous_file} (version {previous.get('version')}, {previous.get('git')}):")
+    for name in sorted(set(old) & set(new)):
+        if old[name]:
+            print(f"  {name:<50} {old[name]:>12.3f} -> {new[name]:>12.3f}  ({new[name] / old[name]:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VBlogger stage benchmarks")
+    parser.add_argument("--photos", type=int, default=40, help="Synthetic photos to generate")
+    parser.add_argument("--videos", type=int, default=4, help="Synthetic videos to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for ingestion and rendering")
+    parser.add_argument("--full-size", action="store_true", help="Render at 1920x1080 instead of 640x360")
+    parser.add_argument("--skip-render", action="store_true", help="Do not time build_video")
+    parser.add_argument("--keep", help="Generate the library into this folder and keep it")
+    parser.add_argument("--output", "-o", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    work_dir = args.keep or tempfile.mkdtemp(prefix="vblogger_bench_")
+    input_dir = os.path.join(work_dir, "input")
+    settings = RenderSettings() if args.full_size else RenderSettings(size=(640, 360), fps=15, preset="ultrafast")
+    try:
+        if os.path.isdir(input_dir) and os.listdir(input_dir):
+            print(f"Reusing synthetic library in {input_dir}")
+            photos = [os.path.join(input_dir, f) for f in sorted(os.listdir(input_dir)) if f.startswith("IMG_")]
+        else:
+            print(f"Generating {args.photos} photos and {args.videos} videos in {input_dir}")
+            photos, _ = generate_library(input_dir, args.photos, args.videos, seed=args.seed)
+
+        stages = {}
+        segments, stages["process_media"] = bench_process_media(input_dir, args.jobs)
+        stages["is_blurry"] = bench_is_blurry(photos)
+        stages["group_by_time"] = bench_group_by_time(segments)
+        stages["create_media_clips"] = bench_create_media_clips(segments, settings)
+        if not args.skip_render:
+            output_file = os.path.join(work_dir, "benchmark.mp4")
+            stages["build_video"] = bench_build_video(segments, settings, output_file, args.jobs)
+
+        results = {
+            "version": __version__,
+            "git": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {"photos": args.photos, "videos": args.videos, "seed": args.seed, "jobs": args.jobs},
+            "stages": stages,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(json.dumps(stages, indent=2))
+        print(f"Results written to {args.output}")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
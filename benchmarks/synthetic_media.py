@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic inputs for the benchmarks.
+Writes JPEG photos with EXIF timestamps and GPS, HEIC photos when
+pillow-heif is installed, and short MP4s rendered from NumPy frames through
+ffmpeg. The same seed always produces the same files and metadata, and
+nothing is downloaded.
+"""
+
+import os
+import subprocess
+from datetime import datetime, timedelta
+
+import numpy as np
+import piexif
+from PIL import Image, ImageFilter
+
+from utils.ffmpegHelper import get_ffmpeg_path
+from utils.imageHelper import HEIF_SUPPORTED
+
+START_TIME = datetime(2025, 7, 26, 8, 0, 0)
+START_GPS = (41.3, -74.1)  # degrees
+
+
+def _rational(value):
+    """EXIF (degrees, minutes, seconds) rationals for a non-negative float."""
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+    return ((degrees, 1), (minutes, 1), (seconds, 100))
+
+
+def exif_bytes(timestamp, lat, lon):
+    stamp = timestamp.strftime("%Y:%m:%d %H:%M:%S").encode()
+    exif = {
+        "0th": {piexif.ImageIFD.DateTime: stamp},
+        "Exif": {piexif.ExifIFD.DateTimeOriginal: stamp, piexif.ExifIFD.DateTimeDigitized: stamp},
+        "GPS": {
+            piexif.GPSIFD.GPSLatitudeRef: b"N" if lat >= 0 else b"S",
+            piexif.GPSIFD.GPSLatitude: _rational(abs(lat)),
+            piexif.GPSIFD.GPSLongitudeRef: b"E" if lon >= 0 else b"W",
+            piexif.GPSIFD.GPSLongitude: _rational(abs(lon)),
+        },
+    }
+    return piexif.dump(exif)
+
+
+def synthetic_image(rng, size, blurry=False):
+    """A textured RGB image of coarse random blocks, optionally blurred."""
+    width, height = size
+    blocks = rng.integers(0, 256, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    img = Image.fromarray(blocks).resize((width, height), Image.NEAREST)
+    if blurry:
+        img = img.filter(ImageFilter.GaussianBlur(max(4, width // 200)))
+    return img
+
+
+def photo_plan(count, seed=0, burst_every=5, gap_every=12):
+    """(timestamp, lat, lon, blurry, burst) for each photo.
+
+    Photos are a few minutes apart; every gap_every-th photo starts after a
+    two-hour gap (a new segment), every burst_every-th is followed by a
+    near-identical frame, and every seventh photo is blurry.
+    """
+    rng = np.random.default_rng(seed)
+    plan = []
+    t = START_TIME
+    lat, lon = START_GPS
+    for i in range(count):
+        t += timedelta(hours=2) if i and i % gap_every == 0 else timedelta(seconds=int(rng.integers(30, 600)))
+        lat += float(rng.normal(0, 0.002))
+        lon += float(rng.normal(0, 0.002))
+        plan.append((t, lat, lon, i % 7 == 3, i % burst_every == 1))
+    return plan
+
+
+def write_photos(folder, count, size=(4032, 3024), seed=0, heic_every=0):
+    """Write count photos into folder and return their paths.
+
+    With heic_every > 0 and pillow-heif installed, every heic_every-th photo
+    is saved as HEIC instead of JPEG.
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    previous = None
+    for i, (timestamp, lat, lon, blurry, burst) in enumerate(photo_plan(count, seed)):
+        if burst and previous is not None:
+            # Same scene a moment later: shifted by a few pixels
+            img = Image.fromarray(np.roll(np.asarray(previous), 3, axis=1))
+        else:
+            img = synthetic_image(rng, size, blurry)
+        previous = img
+        exif = exif_bytes(timestamp, lat, lon)
+        if heic_every and HEIF_SUPPORTED and i % heic_every == 0:
+            path = os.path.join(folder, f"IMG_{i:05d}.heic")
+            img.save(path, "HEIF", exif=exif)
+        else:
+            path = os.path.join(folder, f"IMG_{i:05d}.jpg")
+            img.save(path, "JPEG", quality=90, exif=exif)
+        mtime = timestamp.timestamp()
+        os.utime(path, (mtime, mtime))
+        paths.append(path)
+    return paths
+
+
+def write_video(path, seconds=3.0, size=(1280, 720), fps=30, seed=0, timestamp=START_TIME, audio=True):
+    """Render a moving-pattern MP4 from NumPy frames piped into ffmpeg."""
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to generate synthetic videos")
+    width, height = size
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8).repeat(8, 0).repeat(8, 1)
+    cmd = [ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-"]
+    if audio:
+        cmd += ["-f", "lavfi", "-t", f"{seconds}", "-i", "sine=frequency=440:sample_rate=44100"]
+    cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            *(["-c:a", "aac"] if audio else []),
+            "-metadata", f"creation_time={timestamp.isoformat()}", "-shortest", path]
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    for n in range(int(seconds * fps)):
+        process.stdin.write(np.roll(base, n * 4, axis=1).tobytes())
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed writing {path}")
+    mtime = timestamp.timestamp()
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def write_videos(folder, count, seconds=3.0, size=(1280, 720), fps=30, seed=0):
+    """Write count videos interleaved in time with the photos; every other one has no audio."""
+    paths = []
+    for i in range(count):
+        timestamp = START_TIME + timedelta(minutes=7 + 23 * i)
+        path = os.path.join(folder, f"VID_{i:05d}.mp4")
+        paths.append(write_video(path, seconds, size, fps, seed + i, timestamp, audio=i % 2 == 0))
+    return paths
+
+
+def generate_library(folder, photos=40, videos=4, photo_size=(4032, 3024), video_seconds=3.0,
+                     seed=0, heic_every=5):
+    """Create a complete synthetic input folder and return (photo paths, video paths)."""
+    os.makedirs(folder, exist_ok=True)
+    return (write_photos(folder, photos, photo_size, seed, heic_every),
+            write_videos(folder, videos, video_seconds, seed=seed))
+
+
+def synthetic_items(count, seed=0):
+    """In-memory media items (no files) for timing the planning stages at library scale."""
+    return [
+        {"type": "photo", "file": f"IMG_{i:06d}.jpg", "timestamp": t, "lat": lat, "lon": lon,
+         "width": 4032, "height": 3024, "creation_time": t, "sharpness": 100.0, "phash": None}
+        for i, (t, lat, lon, _, _) in enumerate(photo_plan(count, seed))
+    ]
@@ -117,4 +117,9 @@ def validate_config(config: Dict[str, Any]) -> bool:
     if not os.path.exists(config['MUSIC_FILE']):
         raise ValueError(f"Music file does not exist: {config['MUSIC_FILE']}")
     
+    # Spatio-temporal segmentation needs a positive split distance
+    distance_km = config.get('SEGMENT_DISTANCE_KM')
+    if distance_km is not None and not distance_km > 0:
+        raise ValueError(f"SEGMENT_DISTANCE_KM must be greater than 0 (or None to split on time only): {distance_km}")
+    
     return True 
\ No newline at end of file
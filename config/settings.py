@@ -10,10 +10,12 @@ ASSETS_DIR = os.path.join(PROJECT_ROOT, "assets")
 INPUT_DIR = os.path.join(ASSETS_DIR, "input")
 OUTPUT_DIR = os.path.join(ASSETS_DIR, "output")
 MUSIC_DIR = os.path.join(ASSETS_DIR, "music")
+CACHE_DIR = os.path.join(ASSETS_DIR, "cache")  # ingestion/render caches
 
 # Default settings
 DEFAULT_PHOTO_DURATION = 3.0  # seconds
 DEFAULT_VIDEO_DURATION = 5.0  # seconds
+DEFAULT_COVER_DURATION = 3.0  # seconds
 DEFAULT_TRANSITION_DURATION = 0.5  # seconds
 
 # Video settings
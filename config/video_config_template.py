@@ -21,7 +21,7 @@ TEXT_STROKE_WIDTH = 2  # Text outline width
 
 # Timing Settings
 PHOTO_DURATION = 3.0  # Duration for each photo (seconds)
-VIDEO_DURATION = 5.0  # Duration for each video (seconds)
+VIDEO_DURATION = 5.0  # Duration for each video (seconds); longer videos are trimmed to their best window
 TRANSITION_DURATION = 0.5  # Transition duration (seconds)
 COVER_DURATION = 3.0  # Title/ending screen duration (seconds)
 
@@ -37,4 +37,13 @@ AUDIO_FADE_OUT = 2.0  # Music fade out duration (seconds)
 
 # Processing Options
 TESTING_MODE = False  # Set to True for testing with fewer files
-AUTO_ASPECT_RATIO = True  # Automatically handle aspect ratio issues 
\ No newline at end of file
+AUTO_ASPECT_RATIO = True  # Automatically handle aspect ratio issues
+# CACHE_DIR = r"assets\cache"  # Optional: where analysis/render caches are kept
+# SEGMENT_DISTANCE_KM = 2.0  # Optional: also start a new segment when the location moves this far
+# SEGMENT_TIME_GAP = 10800  # Optional: time gap (seconds) that starts a new segment (default 3600, or 10800 with SEGMENT_DISTANCE_KM)
+# SCAN_DEPTH = 8  # Optional: subfolder levels of INPUT_FOLDER to scan (0 = top folder only)
+# HEIC_CACHE_DIR = r"assets\cache"  # Optional: keep JPG conversions of HEIC photos here 
+# DEDUP_MAX_DISTANCE = 6  # Optional: pHash bit difference at which photos count as near-duplicates
+# DEDUP_TIME_WINDOW = 600  # Optional: seconds within which photos of a segment can be near-duplicates
+# MAX_OPEN_VIDEOS = 4  # Optional: video readers kept open at once per render process
+# WATCH_DEBOUNCE = 2.0  # Optional: quiet seconds after a change before --watch re-renders
@@ -6,7 +6,16 @@ A Python package for creating video blogs from images and videos.
 __version__ = "1.0.0"
 __author__ = "VBlogger Team"
 
-from .pixPicker import process_media
-from .composer import build_video
+import importlib
 
-__all__ = ['process_media', 'build_video'] 
\ No newline at end of file
+_EXPORTS = {'process_media': 'pixPicker', 'build_video': 'composer'}
+
+
+def __getattr__(name):
+    # Imported on first use: the pipeline modules load OpenCV and moviepy
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['process_media', 'build_video']
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Batch mode.
+Renders several project configs in one process. Ingestion and rendering of
+every project run on process pools shared by all projects and sized to the
+machine: a file that appears in more than one project's input folder is
+analyzed once, and render parts of all projects are queued on the same
+workers so no core idles while one project joins its parts. A timing
+summary per project is printed at the end.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from config.config_loader import load_config, validate_config
+from config.settings import CACHE_DIR
+from src.pixPicker import scan_media, segment_items, _ingest_batch, SCAN_DEPTH, INGEST_BATCH
+from src.composer import build_video, set_max_open_videos, MAX_OPEN_VIDEOS
+from src.timeline import render_settings
+from utils.dedupHelper import remove_near_duplicates, DEDUP_MAX_DISTANCE, DEDUP_TIME_WINDOW
+from utils.highlightPicker import attach_highlights
+from utils.ingestCache import IngestCache, file_key
+from utils.proxyCache import attach_proxies
+
+
+@dataclass
+class Project:
+    """One config of a batch and what happened to it."""
+    name: str
+    config: dict = None
+    cache_dir: str = None
+    output_file: str = None
+    files: list = field(default_factory=list)  # (path, file_key) in scan order
+    misses: list = field(default_factory=list)  # file_keys that were not in this project's cache
+    segments: list = field(default_factory=list)
+    analyzed: int = 0
+    shared: int = 0
+    cached: int = 0
+    ingest_seconds: float = 0.0
+    render_seconds: float = 0.0
+    video_seconds: float = 0.0
+    error: str = None
+
+
+def load_projects(names, no_cache=False):
+    projects = []
+    for name in names:
+        project = Project(name)
+        try:
+            project.config = load_config(name)
+            validate_config(project.config)
+            project.cache_dir = None if no_cache else project.config.get('CACHE_DIR', CACHE_DIR)
+            project.output_file = project.config['OUTPUT_FILE']
+        except Exception as e:
+            project.error = str(e)
+            print(f"❌ {name}: {e}")
+        projects.append(project)
+    return projects
+
+
+def ingest_projects(projects, executor):
+    """Analyze the media of every project on executor; each distinct file is analyzed once.
+
+    Files are keyed by normalized path, size and mtime, so overlapping input
+    folders share both cache hits and fresh analysis.
+    """
+    start = time.perf_counter()
+    analysis = {}  # file_key -> analyzed item (None for rejected files)
+    failed = set()  # file_keys whose analysis failed; not cached, so retried next run
+    scheduled = set()
+    batches = []  # (project, [(file_key, task)], future)
+    for project in projects:
+        if project.error:
+            continue
+        config = project.config
+        heic_cache_dir = config.get('HEIC_CACHE_DIR')
+        cache = IngestCache(project.cache_dir) if project.cache_dir else None
+        batch = []
+        for folder_path, file, stat_result in scan_media(config['INPUT_FOLDER'], config.get('SCAN_DEPTH', SCAN_DEPTH)):
+            path = os.path.join(folder_path, file)
+            key = file_key(path, stat_result)
+            project.files.append((path, key))
+            if cache is not None:
+                found, item = cache.get(key)
+                if found:
+                    analysis.setdefault(key, item)
+                    project.cached += 1
+                    continue
+                project.misses.append(key)
+            if key in scheduled or key in analysis:
+                project.shared += 1
+                continue
+            scheduled.add(key)
+            project.analyzed += 1
+            batch.append((key, (folder_path, file)))
+            if len(batch) == INGEST_BATCH:
+                batches.append((project, batch, executor.submit(_ingest_batch, [t for _, t in batch], heic_cache_dir)))
+                batch = []
+        if batch:
+            batches.append((project, batch, executor.submit(_ingest_batch, [t for _, t in batch], heic_cache_dir)))
+        if cache is not None:
+            cache.close()
+        project.ingest_seconds = time.perf_counter() - start
+
+    for project, batch, future in batches:
+        for (key, _), (_, _, _, item, final) in zip(batch, future.result()):
+            analysis[key] = item
+            if not final:
+                failed.add(key)
+        # Ready once the last of its own batches is done
+        project.ingest_seconds = time.perf_counter() - start
+
+    for project in projects:
+        if project.error:
+            continue
+        if project.cache_dir:
+            cache = IngestCache(project.cache_dir)
+            for key in project.misses:
+                if key not in failed:
+                    cache.put(key, analysis[key])
+            cache.prune(project.config['INPUT_FOLDER'], {key[0] for _, key in project.files})
+            cache.close()
+        items = []
+        for path, key in project.files:
+            item = analysis[key]
+            if item is not None:
+                items.append({**item, "file": path})
+        project.segments = segment_items(items, project.config.get('SEGMENT_DISTANCE_KM'),
+                                         project.config.get('SEGMENT_TIME_GAP'))
+    print(f"Ingested {len(scheduled)} files for {sum(1 for p in projects if not p.error)} projects "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def prepare_project(project, args, jobs):
+    """Dedup photos and attach highlight windows and proxies to a project's segments.
+
+    Run for one project at a time: a source shared with an earlier project
+    (in the same cache dir) then finds its highlight scores and proxy in the
+    cache instead of being sampled or transcoded again by a concurrent render.
+    """
+    config = project.config
+    start = time.perf_counter()
+    segments = project.segments
+    if not args.keep_duplicates:
+        segments = remove_near_duplicates(segments, config.get('DEDUP_MAX_DISTANCE', DEDUP_MAX_DISTANCE),
+                                          config.get('DEDUP_TIME_WINDOW', DEDUP_TIME_WINDOW))
+    if config.get('VIDEO_DURATION') and not args.full_videos:
+        segments = attach_highlights(segments, config['VIDEO_DURATION'], project.cache_dir, jobs=jobs)
+    if args.preview:
+        base, ext = os.path.splitext(project.output_file)
+        project.output_file = f"{base}_preview{ext}"
+        if project.cache_dir:
+            segments = attach_proxies(segments, project.cache_dir, jobs=jobs)
+    project.segments = segments
+    project.render_seconds = time.perf_counter() - start
+
+
+def render_project(project, args, executor, render_jobs):
+    config = project.config
+    start = time.perf_counter()
+    settings = render_settings(config, preview=args.preview)
+    project.video_seconds, _, _ = build_video(
+        project.segments, project.output_file, config['TITLE'], config['SUBTITLE'], config['MUSIC_FILE'],
+        jobs=render_jobs, cache_dir=project.cache_dir, backend=args.backend, settings=settings,
+        executor=executor if args.backend == "moviepy" else None)
+    project.render_seconds += time.perf_counter() - start
+
+
+def print_summary(projects):
+    print(f"\n{'Project':<32} {'Files':>6} {'New':>6} {'Shared':>6} {'Cached':>6} "
+          f"{'Ingest':>8} {'Render':>8} {'Video':>8}")
+    for p in projects:
+        if p.error:
+            print(f"{p.name:<32} ❌ {p.error}")
+            continue
+        print(f"{p.name:<32} {len(p.files):>6} {p.analyzed:>6} {p.shared:>6} {p.cached:>6} "
+              f"{p.ingest_seconds:>7.1f}s {p.render_seconds:>7.1f}s {p.video_seconds:>7.1f}s  {p.output_file}")
+
+
+def render_projects(projects, args, executor, jobs, render_jobs):
+    """Render every project that has not failed, with its render parts on executor."""
+    for project in projects:
+        if not project.error:
+            try:
+                prepare_project(project, args, jobs)
+            except Exception as e:
+                project.error = str(e)
+    # One thread per project feeds the shared pool; the ffmpeg backend
+    # already uses every core per render, so those run one at a time.
+    # Clips two projects have in common are encoded once (see build_video_parallel)
+    runnable = [p for p in projects if not p.error]
+    threads = len(runnable) if args.backend == "moviepy" else 1
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as renderers:
+        futures = {p.name: renderers.submit(render_project, p, args, executor, render_jobs) for p in runnable}
+        for project in runnable:
+            try:
+                futures[project.name].result()
+            except Exception as e:
+                project.error = str(e)
+
+
+def run_batch(names, args, jobs=None, render_jobs=None):
+    """Ingest every config in names on a pool of jobs workers and render them on render_jobs workers.
+
+    jobs defaults to all cores and render_jobs to jobs, in which case one
+    pool serves both. Returns the projects; failed ones carry an error
+    message instead of stopping the batch.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    render_jobs = render_jobs or jobs
+    projects = load_projects(names, args.no_cache)
+    start = time.perf_counter()
+    max_open = min([p.config.get('MAX_OPEN_VIDEOS', MAX_OPEN_VIDEOS) for p in projects if not p.error]
+                   or [MAX_OPEN_VIDEOS])
+    with ProcessPoolExecutor(max_workers=jobs, initializer=set_max_open_videos, initargs=(max_open,)) as executor:
+        ingest_projects(projects, executor)
+        if not args.dry_run:
+            if render_jobs == jobs:
+                render_projects(projects, args, executor, jobs, render_jobs)
+            else:
+                with ProcessPoolExecutor(max_workers=render_jobs, initializer=set_max_open_videos,
+                                         initargs=(max_open,)) as render_pool:
+                    render_projects(projects, args, render_pool, jobs, render_jobs)
+    print_summary(projects)
+    print(f"Batch of {len(projects)} projects finished in {time.perf_counter() - start:.1f}s "
+          f"with {jobs} ingest and {render_jobs} render workers")
+    return projects
@@ -1,20 +1,135 @@
 import os
 import sys
+import json
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils'))
-from utils.formatHelper import filename_to_subtitle, create_subtitled_clip, PHOTO_DURATION, create_cover_clip
-from utils.handleAspectRatio import fit_clip_to_size
-from moviepy.audio.fx.all import audio_loop
+from PIL import Image
+from utils.formatHelper import (filename_to_subtitle, create_subtitled_clip, create_cover_clip,
+                                bake_subtitle, render_title_overlay)
+from utils.handleAspectRatio import fit_clip_to_size, fit_image_to_size
+from utils.ffmpegHelper import concat_copy, mux_music_bed, run_ffmpeg
+from utils.musicBed import render_music_bed
+from utils.renderCache import RenderCache
+from utils.profiler import span, record_span, profiled, now_us
+from config.settings import DEFAULT_FPS
+from src.timeline import RenderSettings, timeline_duration
+from moviepy.audio.AudioClip import AudioClip, CompositeAudioClip
+from moviepy.video.VideoClip import VideoClip
 from moviepy.editor import (
     VideoFileClip, 
     ImageClip, 
     concatenate_videoclips, 
     # TextClip, 
     # CompositeVideoClip, 
-    CompositeAudioClip,
-    AudioFileClip
 )
 
-def create_media_clips(segments):
+
+BACK_COVER = ("Welcome back!", "See you soon")
+MAX_OPEN_VIDEOS = 4  # video readers (ffmpeg processes) kept open at once per render process
+
+
+class VideoReaderPool:
+    """Opens VideoFileClips on demand and keeps at most max_open of them alive.
+
+    The timeline is read front to back, so the least recently used reader
+    is the one the render has moved past; it is closed (ending its ffmpeg
+    subprocesses) when another video needs a slot.
+    """
+
+    def __init__(self, max_open=MAX_OPEN_VIDEOS):
+        self.max_open = max(1, max_open)
+        self.readers = OrderedDict()
+
+    def get(self, path):
+        clip = self.readers.pop(path, None)
+        if clip is None:
+            while len(self.readers) >= self.max_open:
+                _, oldest = self.readers.popitem(last=False)
+                oldest.close()
+            clip = VideoFileClip(path)
+        self.readers[path] = clip
+        return clip
+
+    def close_all(self):
+        while self.readers:
+            _, clip = self.readers.popitem()
+            clip.close()
+
+
+_reader_pool = None
+
+def reader_pool():
+    """This process's VideoReaderPool."""
+    global _reader_pool
+    if _reader_pool is None:
+        _reader_pool = VideoReaderPool()
+    return _reader_pool
+
+def set_max_open_videos(max_open):
+    """Cap the open video readers of this process (also the pool worker initializer)."""
+    global _reader_pool
+    if _reader_pool is not None:
+        _reader_pool.close_all()
+    _reader_pool = VideoReaderPool(max_open)
+
+
+def lazy_video_clip(item, pool):
+    """A clip for a video item that opens no reader until a frame or audio chunk is requested.
+
+    Size, duration and fps come from the ingestion probe; frames and audio
+    are fetched through the pool, which may close and later reopen the
+    underlying VideoFileClip. Draft renders read the item's proxy_file.
+    Highlight items play from their clip_start, so only that window is decoded.
+    """
+    path = item.get('proxy_file') or item['file']
+    start = item.get('clip_start') or 0.0
+    clip = VideoClip()  # built empty: passing make_frame would decode frame 0 right away
+    clip.make_frame = lambda t: pool.get(path).get_frame(start + t)
+    clip.size = (item['width'], item['height'])
+    clip.fps = item.get('frame_rate') or DEFAULT_FPS
+    clip = clip.set_duration(item['duration'])
+    if item.get('audio_codec'):
+        audio = AudioClip()  # likewise, AudioClip(make_frame) would probe frame 0
+        audio.make_frame = lambda t: pool.get(path).audio.get_frame(start + t)
+        audio.nchannels = 2  # moviepy's audio reader always decodes to stereo
+        audio.fps = 44100
+        clip = clip.set_audio(audio.set_duration(item['duration']))
+    return clip
+
+def photo_source(item):
+    """Path to decode for a photo item: its cached JPG conversion if present, else the original.
+
+    HEIC originals open through pillow-heif.
+    """
+    path = item.get('converted_file') or item['file']
+    if not os.path.exists(path):
+        path = item['file']
+    return path
+
+
+def flatten_photo(item, subtitle, target_size=(1920, 1080), bg_color=(0, 128, 128)):
+    """The one frame a photo clip shows: letterboxed on bg_color with the subtitle baked in.
+
+    Composed once with PIL, so the clip is a constant frame instead of a
+    stack of layers moviepy would re-compose for every output frame.
+    """
+    with Image.open(photo_source(item)) as img:
+        frame = fit_image_to_size(img, target_size, bg_color)
+    return np.asarray(bake_subtitle(frame, subtitle))
+
+
+@profiled
+def create_media_clips(segments, settings=RenderSettings(), pool=None):
+    """Build the fitted, subtitled clip of every item; videos are opened lazily through pool."""
+    pool = pool or reader_pool()
+    target_size = settings.size
     media_clips = []
     for i, segment in enumerate(segments):
         # print(f"\n--- Adding {i+1} ---")
@@ -22,42 +137,369 @@ def create_media_clips(segments):
             vfile = item['file']
             fname = os.path.basename(vfile)
             subtitle = filename_to_subtitle(fname)
-            if item['type'] == "photo":
-                clip = ImageClip(vfile).set_duration(PHOTO_DURATION)                 
-                clip = fit_clip_to_size(clip, target_size=(1920, 1080), bg_color=(0,128,128))
-                clip = create_subtitled_clip(clip, subtitle, PHOTO_DURATION)
-            elif item['type'] == "video":
-                clip = VideoFileClip(vfile)
-                clip = fit_clip_to_size(clip, target_size=(1920, 1080), bg_color=(0,128,128))
-                clip = create_subtitled_clip(clip, subtitle, clip.duration)
+            with span("create_media_clip", "file", file=vfile):
+                if item['type'] == "photo":
+                    frame = flatten_photo(item, subtitle, target_size, settings.bg_color)
+                    clip = ImageClip(frame).set_duration(settings.photo_duration)
+                elif item['type'] == "video":
+                    clip = lazy_video_clip(item, pool)
+                    clip = fit_clip_to_size(clip, target_size=target_size, bg_color=settings.bg_color)
+                    clip = create_subtitled_clip(clip, subtitle, clip.duration)
             media_clips.append(clip)
     return media_clips
 
 
+def silence(duration, fps=44100):
+    """Silent stereo track, so every rendered part carries the same audio stream."""
+    def make_frame(t):
+        return np.zeros((len(t), 2)) if np.ndim(t) else np.zeros(2)
+    return AudioClip(make_frame, duration=duration, fps=fps)
+
+
+def write_part(clip, part_file, settings):
+    """Encode one part of a render with the shared settings."""
+    if clip.audio is None:
+        clip = clip.set_audio(silence(clip.duration, settings.audio_fps))
+    clip.write_videofile(
+        part_file,
+        fps=settings.fps,
+        codec=settings.codec,
+        audio_codec=settings.audio_codec,
+        audio_fps=settings.audio_fps,
+        preset=settings.preset,
+        threads=settings.threads,
+        ffmpeg_params=settings.ffmpeg_params(),
+        temp_audiofile=f"{part_file}.audio.m4a",
+        verbose=False,
+        logger=None,
+    )
+
+
+def write_still_part(frame, part_file, duration, settings):
+    """Encode a constant frame as a part, with the same stream parameters as write_part.
+
+    ffmpeg loops the single image itself, so no frame goes through Python.
+    """
+    frame_file = f"{os.path.splitext(part_file)[0]}.png"
+    Image.fromarray(frame).save(frame_file, compress_level=1)
+    try:
+        run_ffmpeg([
+            "-loop", "1", "-framerate", str(settings.fps), "-t", f"{duration:.3f}", "-i", frame_file,
+            "-f", "lavfi", "-t", f"{duration:.3f}", "-i", f"anullsrc=r={settings.audio_fps}:cl=stereo",
+            "-c:v", settings.codec, "-preset", settings.preset, "-threads", str(settings.threads),
+            "-r", str(settings.fps),
+            "-c:a", settings.audio_codec, "-ar", str(settings.audio_fps),
+            *settings.ffmpeg_params(),
+            "-shortest",
+            part_file,
+        ])
+    finally:
+        os.remove(frame_file)
+
+
+def _render_part(job):
+    """Process pool entry point: render a cover, one segment or one media item to its own file.
+
+    Returns (part file, video seconds, worker pid, start in trace microseconds, wall seconds).
+    """
+    kind, payload, part_file, settings = job
+    started = now_us()
+    start = time.perf_counter()
+    # Write under a temporary name so a cached part is never seen half-written
+    temp_file = f"{os.path.splitext(part_file)[0]}.{os.getpid()}.tmp.mp4"
+
+    if kind == "cover" or (kind == "item" and payload['type'] == "photo"):
+        if kind == "cover":
+            frame, duration = np.asarray(render_title_overlay(*payload, settings.size)), settings.cover_duration
+        else:
+            subtitle = filename_to_subtitle(os.path.basename(payload['file']))
+            frame, duration = flatten_photo(payload, subtitle, settings.size, settings.bg_color), settings.photo_duration
+        write_still_part(frame, temp_file, duration, settings)
+        os.replace(temp_file, part_file)
+        return part_file, duration, os.getpid(), started, time.perf_counter() - start
+
+    if kind == "item":
+        clips = create_media_clips([[payload]], settings)
+        clip = clips[0]
+    else:
+        clips = create_media_clips([payload], settings)
+        clip = concatenate_videoclips(clips, method="compose")
+    try:
+        write_part(clip, temp_file, settings)
+        os.replace(temp_file, part_file)
+        return part_file, clip.duration, os.getpid(), started, time.perf_counter() - start
+    finally:
+        for c in clips:
+            c.close()
+        reader_pool().close_all()
+
+
+def item_clip_key(render_cache, item, settings):
+    """Render-cache key of a media item's composed clip."""
+    duration = settings.photo_duration if item['type'] == "photo" else None
+    if item.get('clip_start') is not None:
+        # Highlight window of a longer video
+        duration = (round(item['clip_start'], 3), round(item['duration'], 3))
+    return render_cache.clip_key(
+        item['type'],
+        render_cache.content_hash(item['file']),
+        filename_to_subtitle(os.path.basename(item['file'])),
+        duration,
+        bool(item.get('proxy_file')),
+        settings.cache_fields(),
+    )
+
+
+def plan_parts(segments, title, subtitle, settings, part_dir, render_cache=None):
+    """Return (parts, tasks): every part file in timeline order, and the jobs that must render them.
+
+    Without a render cache the parts are the covers and one file per
+    segment, all rendered. With one, every media item is its own part at a
+    content-addressed path and only clips missing from the cache get a job.
+    """
+    if render_cache is None:
+        tasks = [("cover", (title, subtitle), os.path.join(part_dir, "000_cover.mp4"), settings)]
+        for i, segment in enumerate(segments, 1):
+            tasks.append(("segment", segment, os.path.join(part_dir, f"{i:03d}_segment.mp4"), settings))
+        tasks.append(("cover", BACK_COVER,
+                      os.path.join(part_dir, f"{len(segments) + 1:03d}_back_cover.mp4"), settings))
+        return [task[2] for task in tasks], tasks
+
+    units = [("cover", (title, subtitle))]
+    units += [("item", item) for segment in segments for item in segment]
+    units.append(("cover", BACK_COVER))
+
+    parts, tasks, pending = [], [], set()
+    for kind, payload in units:
+        if kind == "cover":
+            key = render_cache.clip_key("cover", payload, settings.cover_duration, settings.cache_fields())
+        else:
+            key = item_clip_key(render_cache, payload, settings)
+        found, path = render_cache.lookup(key)
+        if not found and path not in pending:
+            pending.add(path)
+            tasks.append((kind, payload, path, settings))
+        parts.append(path)
+    return parts, tasks
+
+
+# Cached part files being rendered right now, shared by the renders running
+# as threads of this process (batch projects), so a clip they have in common
+# is encoded once: part file -> Future of its _render_part job
+_inflight_parts = {}
+_inflight_lock = threading.Lock()
+
+
+def submit_part(pool, task):
+    """Submit a part job; returns (future, owned).
+
+    If another render is already encoding the same cached part, its future
+    is returned with owned False; if that render finished in the meantime
+    the future is None and the part is already in the cache.
+    """
+    part_file = task[2]
+    with _inflight_lock:
+        future = _inflight_parts.get(part_file)
+        if future is not None:
+            return future, False
+        if os.path.exists(part_file):
+            return None, False
+        future = pool.submit(_render_part, task)
+        _inflight_parts[part_file] = future
+
+    def forget(done):
+        with _inflight_lock:
+            if _inflight_parts.get(part_file) is done:
+                del _inflight_parts[part_file]
+
+    future.add_done_callback(forget)
+    return future, True
+
+
+def build_video_parallel(segments, output_file, title, subtitle, music_bed=None,
+                         jobs=None, settings=RenderSettings(), cache_dir=None,
+                         max_open_videos=MAX_OPEN_VIDEOS, executor=None):
+    """Render the covers and segments (or single clips) as separate jobs, then join them.
+
+    Every part is encoded on a process pool with the same RenderSettings,
+    the parts are concatenated with ffmpeg's concat demuxer (stream copy,
+    no re-encode) and the pre-rendered music bed is mixed in by a final
+    ffmpeg pass that copies the video stream. With cache_dir set, each composed clip is kept
+    in the render cache and only new or changed clips are encoded.
+    executor, a process pool of jobs workers, can be passed in to share one
+    pool between several renders; otherwise a pool is made for this render.
+    Concurrent renders wait for a cached part another one is encoding
+    instead of encoding it again.
+    Returns the seconds of video that were encoded (not taken from the cache).
+    """
+    jobs = jobs or os.cpu_count() or 1
+    # Split the encoder threads over the workers instead of oversubscribing
+    settings = replace(settings, threads=max(1, (os.cpu_count() or 1) // jobs))
+    out_dir = os.path.dirname(os.path.abspath(output_file))
+    os.makedirs(out_dir, exist_ok=True)
+    part_dir = tempfile.mkdtemp(prefix="vblogger_parts_", dir=out_dir)
+    render_cache = RenderCache(cache_dir) if cache_dir else None
+    try:
+        parts, tasks = plan_parts(segments, title, subtitle, settings, part_dir, render_cache)
+        if render_cache is not None:
+            render_cache.close()
+            print(f"Render cache: {render_cache.hits} clips reused, {len(tasks)} to render")
+
+        start = time.perf_counter()
+        total_duration = 0.0
+        if tasks:
+            pool = executor or ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=set_max_open_videos,
+                                                   initargs=(max_open_videos,))
+            try:
+                with span("render_parts", jobs=jobs, parts=len(tasks)):
+                    for task, (future, owned) in [(task, submit_part(pool, task)) for task in tasks]:
+                        if future is not None:
+                            part_file, duration, pid, started, elapsed = future.result()
+                        if not owned:
+                            print(f"Reused {os.path.basename(task[2])} from a concurrent render")
+                            continue
+                        total_duration += duration
+                        source = task[1]['file'] if task[0] == "item" else os.path.basename(part_file)
+                        record_span(f"render_{task[0]}", "file", started, int(elapsed * 1e6), pid,
+                                    file=source)
+                        print(f"Rendered {os.path.basename(part_file)}: {duration:.1f}s of video in {elapsed:.1f}s")
+            finally:
+                if executor is None:
+                    pool.shutdown()
+
+        with span("join_parts"):
+            if music_bed:
+                joined = os.path.join(part_dir, "joined.mp4")
+                concat_copy(parts, joined)
+                mux_music_bed(joined, music_bed, output_file, audio_codec=settings.audio_codec)
+            else:
+                concat_copy(parts, output_file, extra_args=["-movflags", "+faststart"])
+        elapsed = time.perf_counter() - start
+        print(f"Rendered {total_duration:.1f}s of new video and joined {len(parts)} parts in {elapsed:.1f}s "
+              f"with {jobs} jobs ({total_duration / elapsed if elapsed > 0 else 0.0:.2f}x realtime)")
+        return total_duration
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+
 # --- Create final video ---
-def build_video(segments, output_file, title, subtitle, music_file=None):
-    clips = create_media_clips(segments)
-    cover = create_cover_clip(title=title, subtitle=subtitle, duration=3 )  # seconds
+@profiled
+def build_video(segments, output_file, title, subtitle, music_file=None, jobs=1, cache_dir=None,
+                backend="moviepy", max_open_videos=MAX_OPEN_VIDEOS, settings=RenderSettings(), executor=None):
+    """Render the vlog at the given RenderSettings; returns (video seconds, wall seconds, encoded seconds).
+
+    backend="ffmpeg" renders everything in a single ffmpeg filtergraph.
+    With the moviepy backend, jobs > 1 renders the covers and segments in
+    parallel, and cache_dir set reuses composed clips from the render cache.
+    At most max_open_videos video readers are open at once per process.
+    With an executor (a shared process pool of jobs workers) the moviepy
+    backend always renders in parts on that pool.
+    The music is rendered once into a looped, faded bed (cached in
+    cache_dir) that every backend only mixes in.
+    Encoded seconds leave out clips reused from the render cache.
+    """
+    start = time.perf_counter()
+    duration = timeline_duration(segments, settings)
+    encoded = duration
+    bed_dir = cache_dir or tempfile.mkdtemp(prefix="vblogger_music_")
+    try:
+        music_bed = None
+        if music_file and os.path.exists(music_file):
+            with span("render_music_bed"):
+                music_bed = render_music_bed(music_file, duration, bed_dir, settings.music_volume,
+                                             settings.music_fade_in, settings.music_fade_out, settings.audio_fps)
+        if backend == "ffmpeg":
+            from src.ffmpegComposer import build_video_ffmpeg
+            build_video_ffmpeg(segments, output_file, title, subtitle, music_bed, settings)
+        elif (jobs and jobs > 1) or cache_dir or executor is not None:
+            encoded = build_video_parallel(segments, output_file, title, subtitle, music_bed, jobs=jobs,
+                                           settings=settings, cache_dir=cache_dir,
+                                           max_open_videos=max_open_videos, executor=executor)
+        else:
+            build_video_single(segments, output_file, title, subtitle, music_bed, settings, max_open_videos)
+    finally:
+        if not cache_dir:
+            shutil.rmtree(bed_dir, ignore_errors=True)
+    return duration, time.perf_counter() - start, encoded
+
+
+def build_video_single(segments, output_file, title, subtitle, music_bed=None,
+                       settings=RenderSettings(), max_open_videos=MAX_OPEN_VIDEOS):
+    """Render the whole timeline as one moviepy graph and one encode.
+
+    The music bed is not mixed in Python: the clip audio is encoded as is
+    and the bed is mixed under it by an ffmpeg pass that copies the video.
+    The clip audio is padded with silence to the full timeline first, since
+    the mix lasts as long as that track.
+    """
+    set_max_open_videos(max_open_videos)
+    clips = create_media_clips(segments, settings)
+    cover = create_cover_clip(title=title, subtitle=subtitle, duration=settings.cover_duration, size=settings.size)
     
     back_cover = create_cover_clip(
        title="Welcome back!",
         subtitle="See you soon",
-        duration=3  # seconds
+        duration=settings.cover_duration,
+        size=settings.size
     )
 
-    final_clip = concatenate_videoclips([cover] + clips + [back_cover], method="compose")
+    final = concatenate_videoclips([cover] + clips + [back_cover], method="compose")
+
+    video_file = output_file
+    if music_bed:
+        # The concatenated track ends with the last clip that has audio
+        padding = silence(final.duration, settings.audio_fps)
+        audio = padding if final.audio is None else CompositeAudioClip([padding, final.audio])
+        final = final.set_audio(audio.set_duration(final.duration))
+        base, ext = os.path.splitext(output_file)
+        video_file = f"{base}.noMusic{ext}"
+
+    try:
+        with span("encode"):
+            final.write_videofile(video_file, fps=settings.fps, codec=settings.codec, audio_codec=settings.audio_codec,
+                                  audio_fps=settings.audio_fps, preset=settings.preset, threads=settings.threads,
+                                  ffmpeg_params=["-movflags", "faststart"])
+    finally:
+        reader_pool().close_all()
+
+    if music_bed:
+        try:
+            with span("mux_music_bed"):
+                mux_music_bed(video_file, music_bed, output_file, audio_codec=settings.audio_codec)
+        finally:
+            os.remove(video_file)
 
-    if music_file and os.path.exists(music_file):
-        # Use fps=44100 and buffersize to limit memory usage
-        audio = AudioFileClip(music_file, fps=44100, buffersize=20000).volumex(0.2)
-        video_duration = final_clip.duration
-        audio_looped = audio_loop(audio, duration=video_duration)
 
-        # Mix with original video audio
-        mixed_audio = CompositeAudioClip([final_clip.audio, audio_looped])
-        final = final_clip.set_audio(mixed_audio)
+def report_render_speed(stats_file, key, preview, video_seconds, elapsed, encoded_seconds=None):
+    """Print the render speed and, when the other mode has been timed before, the preview speedup.
 
-    final.write_videofile(output_file, codec="libx264", audio_codec="aac", threads=4, ffmpeg_params=["-movflags", "faststart"])
+    The speed is encoded video seconds per wall second. The latest preview
+    and final rates of each render target (key, e.g. the output file) are
+    kept in stats_file, a small JSON file, if one is given. Renders that
+    encoded nothing (every clip came from the render cache) are not timed.
+    """
+    encoded_seconds = video_seconds if encoded_seconds is None else encoded_seconds
+    mode = "preview" if preview else "final"
+    if encoded_seconds <= 0:
+        print(f"{mode.capitalize()} render: {video_seconds:.1f}s of video joined from cached clips in {elapsed:.1f}s")
+        return
+    rate = encoded_seconds / elapsed if elapsed > 0 else 0.0
+    print(f"{mode.capitalize()} render: {encoded_seconds:.1f}s of {video_seconds:.1f}s of video encoded "
+          f"in {elapsed:.1f}s ({rate:.2f}x realtime)")
+    if not stats_file:
+        return
+    stats = {}
+    if os.path.exists(stats_file):
+        with open(stats_file, "r", encoding="utf-8") as f:
+            # Entries that are not per-target dicts predate keying and are dropped
+            stats = {k: v for k, v in json.load(f).items() if isinstance(v, dict)}
+    rates = stats.setdefault(key, {})
+    rates[mode] = rate
+    os.makedirs(os.path.dirname(os.path.abspath(stats_file)), exist_ok=True)
+    with open(stats_file, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    if rates.get("preview") and rates.get("final"):
+        print(f"Preview renders {rates['preview'] / rates['final']:.1f}x faster than the last final render")
 
 
 # --- Run it ---
@@ -0,0 +1,169 @@
+"""
+ffmpeg filtergraph render backend.
+Translates the segment timeline into one ffmpeg filtergraph (scale, pad,
+subtitle overlay, concat, music amix) and renders it in a single ffmpeg
+process, so no frame passes through Python.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+from utils.formatHelper import (filename_to_subtitle, generate_subtitle_image, generate_title_image,
+                                subtitle_layout)
+from utils.ffmpegHelper import run_ffmpeg
+from utils.profiler import span
+from src.composer import flatten_photo
+
+
+def _hex_color(rgb):
+    return "0x{:02x}{:02x}{:02x}".format(*rgb)
+
+
+class FilterGraph:
+    """Collects ffmpeg inputs and filter chains for one render."""
+
+    def __init__(self):
+        self.inputs = []
+        self.chains = []
+        self.input_count = 0
+
+    def add_input(self, *args):
+        """Append an input (its options, "-i" and the path) and return its index."""
+        self.inputs.extend(args)
+        self.input_count += 1
+        return self.input_count - 1
+
+    def add(self, chain):
+        self.chains.append(chain)
+
+    def script(self):
+        return ";\n".join(self.chains)
+
+
+def _still_input(graph, path, duration, fps):
+    return graph.add_input("-loop", "1", "-framerate", str(fps), "-t", f"{duration:.3f}", "-i", path)
+
+
+def _silence_input(graph, duration, audio_fps):
+    return graph.add_input("-f", "lavfi", "-t", f"{duration:.3f}",
+                           "-i", f"anullsrc=r={audio_fps}:cl=stereo")
+
+
+def _audio_chain(graph, source, label, duration, audio_fps):
+    """Normalize a clip's audio to the shared format and pad/trim it to the clip length."""
+    graph.add(f"[{source}]aresample={audio_fps},aformat=sample_fmts=fltp:channel_layouts=stereo,"
+              f"apad,atrim=duration={duration:.3f}[{label}]")
+
+
+def build_filtergraph(segments, title, subtitle, settings, work_dir, music_bed=None):
+    """Return (FilterGraph, total_duration) for the whole timeline.
+
+    Videos are fitted into settings.size on bg_color and get their subtitle
+    PNG (rendered at the output width, written once per distinct text)
+    overlaid at the bottom centre, as in the moviepy backend. Photos and
+    covers are flattened to their final frame up front and only looped.
+    All clips are concatenated with their audio; the pre-rendered music bed
+    is mixed under it when music_bed is given.
+    """
+    width, height = settings.size
+    fps, audio_fps = settings.fps, settings.audio_fps
+    bg = _hex_color(settings.bg_color)
+    graph = FilterGraph()
+    labels = []
+    total = 0.0
+    captions = {}
+    caption_size, caption_font = subtitle_layout(width)
+
+    def add_still(image, duration, n):
+        index = _still_input(graph, image, duration, fps)
+        graph.add(f"[{index}:v]setsar=1,fps={fps},format=yuv420p[v{n}]")
+        silence = _silence_input(graph, duration, audio_fps)
+        _audio_chain(graph, f"{silence}:a", f"a{n}", duration, audio_fps)
+        labels.append(n)
+        return duration
+
+    def add_cover(cover_title, cover_subtitle, n):
+        image = generate_title_image(cover_title, cover_subtitle, size=settings.size, output_dir=work_dir)
+        return add_still(image, settings.cover_duration, n)
+
+    total += add_cover(title, subtitle, 0)
+    n = 1
+    for segment in segments:
+        for item in segment:
+            text = filename_to_subtitle(os.path.basename(item['file']))
+            if item['type'] == "photo":
+                frame_file = os.path.join(work_dir, f"photo_{n:05d}.png")
+                Image.fromarray(flatten_photo(item, text, settings.size, settings.bg_color)).save(
+                    frame_file, compress_level=1)
+                total += add_still(frame_file, settings.photo_duration, n)
+                n += 1
+                continue
+
+            duration = item['duration']
+            source = item.get('proxy_file') or item['file']
+            if item.get('clip_start') is not None:
+                # Input seeking: only the highlight window is decoded
+                index = graph.add_input("-ss", f"{item['clip_start']:.3f}", "-t", f"{duration:.3f}", "-i", source)
+            else:
+                index = graph.add_input("-i", source)
+            if item.get('audio_codec'):
+                audio = f"{index}:a"
+            else:
+                audio = f"{_silence_input(graph, duration, audio_fps)}:a"
+            if text not in captions:
+                captions[text] = generate_subtitle_image(text, caption_size, caption_font, output_dir=work_dir)
+            overlay = _still_input(graph, captions[text], duration, fps)
+            graph.add(f"[{index}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                      f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color={bg},setsar=1,fps={fps}[b{n}]")
+            graph.add(f"[b{n}][{overlay}:v]overlay=(W-w)/2:H-h:shortest=1,"
+                      f"trim=duration={duration:.3f},format=yuv420p[v{n}]")
+            _audio_chain(graph, audio, f"a{n}", duration, audio_fps)
+            labels.append(n)
+            total += duration
+            n += 1
+    total += add_cover("Welcome back!", "See you soon", n)
+
+    streams = "".join(f"[v{i}][a{i}]" for i in labels)
+    if music_bed:
+        graph.add(f"{streams}concat=n={len(labels)}:v=1:a=1[vout][acat]")
+        music = graph.add_input("-i", music_bed)
+        graph.add(f"[{music}:a]aresample={audio_fps}[m]")
+        graph.add("[acat][m]amix=inputs=2:duration=first:normalize=0[aout]")
+    else:
+        graph.add(f"{streams}concat=n={len(labels)}:v=1:a=1[vout][aout]")
+    return graph, total
+
+
+def build_video_ffmpeg(segments, output_file, title, subtitle, music_bed, settings):
+    """Render the whole vlog in one ffmpeg process from a generated filtergraph."""
+    work_dir = tempfile.mkdtemp(prefix="vblogger_ffmpeg_")
+    try:
+        with span("build_filtergraph"):
+            graph, total = build_filtergraph(segments, title, subtitle, settings, work_dir, music_bed)
+        # Written to a file: the graph for a few hundred clips exceeds command-line limits
+        script_file = os.path.join(work_dir, "filtergraph.txt")
+        with open(script_file, "w", encoding="utf-8") as f:
+            f.write(graph.script())
+
+        start = time.perf_counter()
+        with span("encode"):
+            run_ffmpeg([
+                *graph.inputs,
+                "-filter_complex_script", script_file,
+                "-map", "[vout]", "-map", "[aout]",
+                "-c:v", settings.codec, "-preset", settings.preset, "-r", str(settings.fps),
+                "-pix_fmt", "yuv420p",
+                "-c:a", settings.audio_codec, "-ar", str(settings.audio_fps), "-ac", "2",
+                "-threads", str(os.cpu_count() or 1),
+                "-movflags", "+faststart",
+                output_file,
+            ])
+        elapsed = time.perf_counter() - start
+        frames = total * settings.fps
+        print(f"Rendered {total:.1f}s of video in {elapsed:.1f}s "
+              f"({frames / elapsed if elapsed > 0 else 0.0:.1f} frames/s) with the ffmpeg backend")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
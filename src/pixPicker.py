@@ -1,42 +1,70 @@
 import os
+import io
+import math
 import cv2
+import numpy as np
 import piexif
 from PIL import Image
-from moviepy.editor import VideoFileClip
 from datetime import datetime
+from pathlib import Path
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils.ffmpegHelper import get_ffmpeg_path
+from utils.imageHelper import HEIF_SUPPORTED, is_heif, convert_heif_cached, heif_cache_path
+from utils.ingestCache import IngestCache, file_key
+from utils.dedupHelper import perceptual_hash
+from utils.geoHelper import spatial_segment_starts
+from utils.metaData import get_video_metadata as probe_video
+from utils.profiler import span, record_span, profiled, now_us
 
 PHOTO_EXTS = (".jpg", ".jpeg", ".png", ".heic", ".heif")
 VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv")
 TIME_GAP_THRESHOLD = 60 * 60  # 1 hour in seconds
-
-FFMPEG_PATH = r"D:\projects\tools\ffmpeg-7.1.1-essentials_build\bin\ffmpeg.exe" 
+SPATIAL_TIME_GAP = 3 * 60 * 60  # time gap that still splits segments when they are also split by distance
+SCAN_DEPTH = 8  # subfolder levels below the input folder that are scanned (DCIM/100APPLE/... included)
+INGEST_BATCH = 4  # files per pool task; small, so workers start while the scan is still running
+BLUR_THRESHOLD = 50  # Laplacian variance (full decode resized to BLUR_MAX_SIDE) below this is considered blurry
+BLUR_MAX_SIDE = 1000  # blur is measured on images downscaled to this size
+# A reduced decode scores at most ~1x the full decode; below threshold times
+# this margin the photo is judged on the full decode instead (see blur_check)
+BLUR_RECHECK_MARGIN = 2.0
 
 def convert_heic_to_jpg(input_path, output_dir=None):
     """
-    Convert HEIC to JPG using ffmpeg. 
-    Returns path to JPG file.
+    Convert HEIC to JPG, in-process via pillow-heif when it is installed and
+    with ffmpeg otherwise. The JPG is content-addressed inside output_dir
+    (default: a vblogger folder in the system temp dir), never written next
+    to the source. Returns path to JPG file.
     """
     if not os.path.exists(input_path):
         raise FileNotFoundError(input_path)
 
-    ext = os.path.splitext(input_path)[1].lower()
-    if ext not in [".heic", ".heif"]:
+    if not is_heif(input_path):
         return input_path  # Already supported image type
 
     if output_dir is None:
-        output_dir = os.path.dirname(input_path)
+        output_dir = os.path.join(tempfile.gettempdir(), "vblogger")
+
+    if HEIF_SUPPORTED:
+        return convert_heif_cached(input_path, output_dir)
 
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0] + ".jpg")
+    output_file = heif_cache_path(input_path, output_dir)
 
     # Check if converted file already exists
     if os.path.exists(output_file):
         return output_file
 
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None:
+        print(f"Warning: no HEIC decoder available for {input_path}, using original")
+        return input_path
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
     # ffmpeg command to convert HEIC to JPG
     cmd = [
-        FFMPEG_PATH,
+        ffmpeg,
         "-y",  # overwrite
         "-i", input_path,
         output_file
@@ -54,221 +82,432 @@ def convert_heic_to_jpg(input_path, output_dir=None):
 
     return output_file
 
-def is_blurry(image_path, threshold=50):
+def laplacian_variance(image):
+    """Laplacian variance of a grayscale image, measured at most BLUR_MAX_SIDE pixels wide."""
+    # Resize image for faster processing if it's very large
+    height, width = image.shape
+    if height > BLUR_MAX_SIDE or width > BLUR_MAX_SIDE:
+        scale = min(BLUR_MAX_SIDE/height, BLUR_MAX_SIDE/width)
+        new_height = int(height * scale)
+        new_width = int(width * scale)
+        image = cv2.resize(image, (new_width, new_height))
+
+    return cv2.Laplacian(image, cv2.CV_64F).var()
+
+def decode_gray_for_blur(img):
+    """Decode a freshly opened PIL image to grayscale for the blur check.
+
+    JPEGs are put in draft mode first, so libjpeg scales them in the DCT
+    domain to the smallest size that still has BLUR_MAX_SIDE pixels on the
+    long side (1/4 for a 12 MP photo) and skips the colour conversion.
+    Other formats decode at full size.
+    """
+    width, height = img.size
+    scale = BLUR_MAX_SIDE / max(width, height, 1)
+    if img.format == "JPEG" and scale < 1:
+        img.draft("L", (math.ceil(width * scale), math.ceil(height * scale)))
+    return img.convert("L")
+
+def blur_check(data, threshold=BLUR_THRESHOLD):
+    """Return (sharpness, blurry, gray) for an encoded image buffer.
+
+    The image is decoded once by decode_gray_for_blur; gray is that decode,
+    which callers reuse (e.g. for the perceptual hash) instead of decoding
+    the buffer again. sharpness is its Laplacian variance, which ranks
+    photos of the same size. A DCT-reduced decode loses the noise and fine
+    detail the full decode counts, scoring anywhere from ~0.04x to ~1x of
+    it, so it only decides "sharp" at or above threshold times
+    BLUR_RECHECK_MARGIN; below that the photo is decoded at full size and
+    judged exactly as the full-decode check did.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        size = img.size
+        gray = decode_gray_for_blur(img)
+    sharpness = float(laplacian_variance(np.asarray(gray)))
+    if gray.size == size:  # not reduced: this is the full-decode score
+        return sharpness, sharpness < threshold, gray
+    if sharpness >= threshold * BLUR_RECHECK_MARGIN:
+        return sharpness, False, gray
+    full = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if full is None:
+        with Image.open(io.BytesIO(data)) as img:
+            full = np.asarray(img.convert("L"))
+    return sharpness, laplacian_variance(full) < threshold, gray
+
+def is_blurry(image_path, threshold=BLUR_THRESHOLD):
     """Check if image is blurry using Laplacian variance."""
     try:
-        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if image is None:
-            return True
-        
-        # Resize image for faster processing if it's very large
-        height, width = image.shape
-        if height > 1000 or width > 1000:
-            scale = min(1000/height, 1000/width)
-            new_height = int(height * scale)
-            new_width = int(width * scale)
-            image = cv2.resize(image, (new_width, new_height))
-        
-        variance = cv2.Laplacian(image, cv2.CV_64F).var()
-        return variance < threshold
+        with open(image_path, "rb") as f:
+            return blur_check(f.read(), threshold)[1]
     except Exception as e:
         print(f"Warning: Could not check blur for {image_path}: {e}")
         return False  # Don't skip if we can't check
 
+def _exif_datetime(exif_dict, fields):
+    """Return the first EXIF datetime found among (ifd, tag) fields, or None."""
+    for ifd, tag in fields:
+        datetime_str = exif_dict.get(ifd, {}).get(tag)
+        if datetime_str:
+            return datetime.strptime(datetime_str.decode(), "%Y:%m:%d %H:%M:%S")
+    return None
+
+def _exif_gps(exif_dict):
+    """Return (lat, lon) in signed float degrees from an EXIF dict."""
+    gps = exif_dict.get('GPS', {})
+
+    def convert(coord):
+        """Convert GPS coordinate tuples to float degrees."""
+        if coord and all(isinstance(x, tuple) and x[1] != 0 for x in coord):
+            d, m, s = [x[0] / x[1] for x in coord]
+            return d + m / 60 + s / 3600
+        return None
+
+    lat = convert(gps.get(piexif.GPSIFD.GPSLatitude))
+    lon = convert(gps.get(piexif.GPSIFD.GPSLongitude))
+
+    # GPSRef: South and West are negative
+    lat_ref = gps.get(piexif.GPSIFD.GPSLatitudeRef)
+    lon_ref = gps.get(piexif.GPSIFD.GPSLongitudeRef)
+    if lat and lat_ref and lat_ref.decode() == 'S':
+        lat = -lat
+    if lon and lon_ref and lon_ref.decode() == 'W':
+        lon = -lon
+    return lat, lon
+
+TIMESTAMP_FIELDS = (("Exif", piexif.ExifIFD.DateTimeOriginal),)
+CREATION_TIME_FIELDS = (
+    ("Exif", piexif.ExifIFD.DateTimeOriginal),
+    ("Exif", piexif.ExifIFD.DateTimeDigitized),
+    ("0th", piexif.ImageIFD.DateTime),
+)
+
 def get_photo_size_create_time(img_path):
     """Return (width, height, creation_time) for an image.
     Falls back to file modified time if creation time not available."""
-    
-    img_path = os.path.normpath(img_path)
-    width, height = None, None
-    creation_time = datetime.fromtimestamp(os.path.getmtime(img_path))
-    
-    try:
-        img = Image.open(img_path)
-        width, height = img.size
-        
-        # Try to get creation time from EXIF
-        exif_bytes = img.info.get('exif')
-        if exif_bytes:
-            try:
-                exif_dict = piexif.load(exif_bytes)
-                
-                # Try different EXIF fields for creation time
-                datetime_str = exif_dict['Exif'].get(piexif.ExifIFD.DateTimeOriginal)
-                if not datetime_str:
-                    datetime_str = exif_dict['Exif'].get(piexif.ExifIFD.DateTime)
-                if not datetime_str:
-                    datetime_str = exif_dict['0th'].get(piexif.ImageIFD.DateTime)
-                
-                if datetime_str:
-                    creation_time = datetime.strptime(datetime_str.decode(), "%Y:%m:%d %H:%M:%S")
-                    
-            except Exception as e:
-                print(f"EXIF creation time parse failed for {img_path}: {e}")
-                
-    except Exception as e:
-        print(f"Warning: Could not get size/creation time for {img_path}: {e}")
-    
-    return width, height, creation_time
+    info = analyze_photo(img_path, check_blur=False)
+    return info["width"], info["height"], info["creation_time"]
 
 def get_photo_metadata(image_path):
     """Return (timestamp, latitude, longitude) for an image.
     Falls back to file modified time and None for missing GPS."""
-    
-    image_path = os.path.normpath(image_path)    
-    timestamp = datetime.fromtimestamp(os.path.getmtime(image_path))
-    lat, lon = None, None
+    info = analyze_photo(image_path, check_blur=False)
+    return info["timestamp"], info["lat"], info["lon"]
+
+def analyze_photo(image_path, check_blur=True):
+    """Read a photo once and return its size, timestamps, GPS and blur check.
+
+    The file is read into memory a single time: PIL parses only the header
+    for the size and EXIF block, piexif parses the EXIF once, and the blur
+    check and perceptual hash share one reduced-resolution decode. Missing timestamps fall back to the file
+    modified time; sharpness is None (and blurry False) only if the blur check itself failed.
+    """
+    image_path = os.path.normpath(image_path)
+    mtime = datetime.fromtimestamp(os.path.getmtime(image_path))
+    info = {
+        "width": None,
+        "height": None,
+        "timestamp": mtime,
+        "creation_time": mtime,
+        "lat": None,
+        "lon": None,
+        "sharpness": None,
+        "blurry": False,
+        "phash": None,
+    }
+
+    with open(image_path, "rb") as f:
+        data = f.read()
 
     try:
-        img = Image.open(image_path)
+        img = Image.open(io.BytesIO(data))  # lazy: reads the header only
+        info["width"], info["height"] = img.size
         exif_bytes = img.info.get('exif')
 
         if exif_bytes:  # ✅ only load if EXIF exists
             try:
                 exif_dict = piexif.load(exif_bytes)
-
-                # --- Timestamp ---
-                datetime_str = exif_dict['Exif'].get(piexif.ExifIFD.DateTimeOriginal)
-                if datetime_str:
-                    timestamp = datetime.strptime(datetime_str.decode(), "%Y:%m:%d %H:%M:%S")
-
-                # --- GPS ---
-                gps = exif_dict.get('GPS', {})
-
-                def convert(coord):
-                    """Convert GPS coordinate tuples to float degrees."""
-                    if coord and all(isinstance(x, tuple) and x[1] != 0 for x in coord):
-                        d, m, s = [x[0] / x[1] for x in coord]
-                        return d + m / 60 + s / 3600
-                    return None
-
-                lat = convert(gps.get(piexif.GPSIFD.GPSLatitude))
-                lon = convert(gps.get(piexif.GPSIFD.GPSLongitude))
-
-                # GPSRef: South and West are negative
-                lat_ref = gps.get(piexif.GPSIFD.GPSLatitudeRef)
-                lon_ref = gps.get(piexif.GPSIFD.GPSLongitudeRef)
-                if lat and lat_ref and lat_ref.decode() == 'S':
-                    lat = -lat
-                if lon and lon_ref and lon_ref.decode() == 'W':
-                    lon = -lon
-
+                info["timestamp"] = _exif_datetime(exif_dict, TIMESTAMP_FIELDS) or mtime
+                info["creation_time"] = _exif_datetime(exif_dict, CREATION_TIME_FIELDS) or mtime
+                info["lat"], info["lon"] = _exif_gps(exif_dict)
             except Exception as e:
                 print(f"EXIF parse failed for {image_path}: {e}")
-
     except Exception as e:
         print(f"Warning: Could not read EXIF for {image_path}: {e}")
 
-    return timestamp, lat, lon
+    if check_blur:
+        gray = None  # grayscale decode, shared by the blur check and the hash
+        try:
+            # HEIC opens through pillow-heif; JPEGs are DCT-scaled while decoding
+            info["sharpness"], info["blurry"], gray = blur_check(data)
+        except Exception as e:
+            print(f"Warning: Could not check blur for {image_path}: {e}")
+
+        # Perceptual hash for near-duplicate removal, from the same decode
+        # (or a small draft decode if the blur check failed)
+        try:
+            if gray is not None:
+                info["phash"] = perceptual_hash(gray)
+            else:
+                with Image.open(io.BytesIO(data)) as img:
+                    info["phash"] = perceptual_hash(img)
+        except Exception as e:
+            print(f"Warning: Could not hash {image_path}: {e}")
+
+    return info
 
 def get_video_metadata(video_path):
-    """Get video metadata with better error handling."""
+    """Probe a video's headers (no frame decoding) and return its item fields, or None to skip it.
+
+    Raises RuntimeError when the video cannot be probed at all (no
+    ffprobe/ffmpeg, a timeout, an unreadable file), which is not a reason to
+    skip it for good.
+    """
+    meta = probe_video(Path(video_path))
+    if meta.duration is None:
+        raise RuntimeError(f"Could not get video metadata for {video_path}")
     try:
-        clip = VideoFileClip(video_path)
         timestamp = datetime.fromtimestamp(os.path.getmtime(video_path))
-        duration = clip.duration
-        width, height = clip.size
-        clip.reader.close()
-        clip.close()  # Ensure proper cleanup
-        
+        duration = meta.duration
+        width, height = meta.display_size
+
         # More lenient criteria for video acceptance
-        if duration < 1 or width < 50 or height < 50:
+        if duration < 1 or (width or 0) < 50 or (height or 0) < 50:
             return None  # skip very short or tiny videos
-        return timestamp, duration
+        return {
+            "timestamp": timestamp,
+            "duration": duration,
+            "width": width,
+            "height": height,
+            "codec": meta.codec,
+            "frame_rate": meta.frame_rate,
+            "audio_codec": meta.audio_codec,
+            "rotation": meta.rotation,
+            "creation_time": meta.creation_time
+        }
     except Exception as e:
         print(f"Warning: Could not get video metadata for {video_path}: {e}")
         return None
 
-def get_one_media_item(folder, file):
+def get_one_media_item(folder, file, heic_cache_dir=None):
+    """Analyze one file and return its media item, or None if it is skipped or cannot be analyzed."""
+    return ingest_media_item(folder, file, heic_cache_dir)[0]
+
+def ingest_media_item(folder, file, heic_cache_dir=None):
+    """Return (media_item, final) for one file.
+
+    media_item is None for files that are skipped. final is True when the
+    result is a decision about the file itself (analyzed, blurry, too short
+    or tiny, not media) and False when the analysis failed (HEIC conversion,
+    video probe or any other error); only final results may be cached,
+    failures are retried on the next run.
+    """
     file_path = os.path.join(folder, file)        
     if file.startswith('.') or os.path.isdir(file_path):
-        return None
+        return None, True
             
     try:
         if file.lower().endswith(PHOTO_EXTS):
             original_file_path = file_path
             processing_path = file_path
             
-            # Convert HEIC files if needed
-            if file.lower().endswith((".heic", ".heif")):                                
+            # HEIC is decoded in memory; convert only when a conversion cache
+            # is configured or there is no in-process decoder
+            if is_heif(file) and (heic_cache_dir or not HEIF_SUPPORTED):
                 try:
-                    processing_path = convert_heic_to_jpg(file_path)
+                    processing_path = convert_heic_to_jpg(file_path, heic_cache_dir)
                 except Exception as e:
                     print(f"Warning: Could not convert HEIC file {file}: {e}")
-                    return None
+                    return None, False
             
+            # Analyze once: size, timestamps, GPS and blur score
+            info = analyze_photo(processing_path)
+
             # Check if image is blurry (skip if it is)
-            if is_blurry(processing_path):
+            if info["blurry"]:
                 print(f"Skipping blurry image: {file}")
-                return None
-                
-            # Get metadata
-            timestamp, lat, lon = get_photo_metadata(processing_path)
-            width, height, creation_time = get_photo_size_create_time(processing_path)
+                return None, True
+
             return {
                 "type": "photo",
                 "file": original_file_path,  # Keep original path for reference
                 "converted_file": processing_path if processing_path != original_file_path else None,
-                "timestamp": timestamp,
-                "lat": lat,
-                "lon": lon,
-                "width": width,
-                "height": height,
-                "creation_time": creation_time
-            }            
+                "timestamp": info["timestamp"],
+                "lat": info["lat"],
+                "lon": info["lon"],
+                "width": info["width"],
+                "height": info["height"],
+                "creation_time": info["creation_time"],
+                "sharpness": info["sharpness"],
+                "phash": info["phash"]
+            }, True
         elif file.lower().endswith(VIDEO_EXTS):
             meta = get_video_metadata(file_path)
             if meta:
-                timestamp, duration = meta
                 return {
                     "type": "video",
                     "file": file_path,
-                    "timestamp": timestamp,
-                    "duration": duration
-                }                
+                    **meta
+                }, True
+        return None, True
     except Exception as e:
         print(f"Error processing {file}: {e}")    
+        return None, False
 
-def process_media(folder):
-    """Process media files in a folder with improved error handling."""
-    media_items = []
-    files = os.listdir(folder)
-    total_items = 0    
-    for i, file in enumerate(files, 1):
-        if total_items % 20 == 0:  # Progress update every 20 files
-            print(f"Progress: {total_items} files processed")            
-        file_path = os.path.join(folder, file)        
-        if file.startswith('.') or os.path.isdir(file_path):
-            continue
-        media_item = get_one_media_item(folder, file)
-        if media_item is not None:
-            total_items += 1
-            media_items.append(media_item)
-
-    for i, flder in enumerate(files, 1):
-        folder_path = os.path.join(folder, flder)
-        if not os.path.isdir(folder_path):
+def scan_media(folder, max_depth=SCAN_DEPTH):
+    """Yield (folder, file, stat_result) for every photo and video under folder, as they are found.
+
+    Walks subfolders up to max_depth levels deep (0 = the folder itself
+    only) with os.scandir, skipping hidden files and folders and not
+    following directory symlinks. The stat results come from the DirEntry,
+    which on Windows costs no extra system call.
+    """
+    stack = [(folder, 0)]
+    while stack:
+        dir_path, depth = stack.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                subdirs = []
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if depth < max_depth:
+                                subdirs.append((entry.path, depth + 1))
+                        elif entry.name.lower().endswith(PHOTO_EXTS + VIDEO_EXTS):
+                            yield dir_path, entry.name, entry.stat()
+                    except OSError as e:
+                        print(f"Warning: Could not read {entry.path}: {e}")
+        except OSError as e:
+            print(f"Warning: Could not scan {dir_path}: {e}")
             continue
-        for j, file in enumerate(os.listdir(folder_path), 1):
-            if (total_items > 0) and (total_items % 20 == 0):  # Progress update every 20 files
-                print(f"Progress: {total_items} files processed")                 
-            file_path = os.path.join(folder_path, file) 
-            if file.startswith('.') or os.path.isdir(file_path):
-                continue
-            media_item = get_one_media_item(folder_path, file)
-            if media_item is not None:
-                total_items += 1
-                media_items.append(media_item)
+        # Reversed so subfolders are visited in listing order
+        stack.extend(reversed(subdirs))
 
-    print(f"Found {len(media_items)} valid media items")
-    if media_items:
-        media_items.sort(key=lambda x: x["timestamp"])
-        return group_by_time(media_items)
+def _ingest_worker(task, heic_cache_dir=None):
+    """Process pool entry point: analyze one file and report who did it and how long it took."""
+    folder, file = task
+    started = now_us()
+    start = time.perf_counter()
+    media_item, final = ingest_media_item(folder, file, heic_cache_dir)
+    return os.getpid(), started, time.perf_counter() - start, media_item, final
+
+def _ingest_batch(tasks, heic_cache_dir=None):
+    """Process pool entry point: _ingest_worker over a few tasks."""
+    return [_ingest_worker(task, heic_cache_dir) for task in tasks]
+
+def print_worker_throughput(worker_stats):
+    """Print files/second for each worker process."""
+    for n, (pid, (count, busy)) in enumerate(sorted(worker_stats.items()), 1):
+        rate = count / busy if busy > 0 else 0.0
+        print(f"Worker {n} (pid {pid}): {count} files in {busy:.1f}s busy, {rate:.2f} files/s")
+
+def _analyze_tasks(tasks, jobs, heic_cache_dir=None, executor=None):
+    """Run ingest_media_item over tasks, serially or on a process pool.
+
+    tasks may be a generator: each task is analyzed (or, with jobs > 1,
+    submitted in INGEST_BATCH batches) as soon as it is produced, so
+    analysis overlaps a slow folder scan. Returns the (media_item, final)
+    results in task order.
+    executor, a process pool, can be passed in to reuse warm workers across
+    calls; otherwise a pool of jobs workers is made for this call.
+    """
+    results = []
+    if executor is not None or (jobs and jobs > 1):
+        worker_stats = {}
+        batches = []
+        pool = executor or ProcessPoolExecutor(max_workers=jobs)
+        try:
+            batch = []
+            for task in tasks:
+                batch.append(task)
+                if len(batch) == INGEST_BATCH:
+                    batches.append((batch, pool.submit(_ingest_batch, batch, heic_cache_dir)))
+                    batch = []
+            if batch:
+                batches.append((batch, pool.submit(_ingest_batch, batch, heic_cache_dir)))
+
+            total = sum(len(batch) for batch, _ in batches)
+            for batch, future in batches:
+                for (folder_path, file), (pid, started, busy, media_item, final) in zip(batch, future.result()):
+                    count, total_busy = worker_stats.get(pid, (0, 0.0))
+                    worker_stats[pid] = (count + 1, total_busy + busy)
+                    record_span("get_one_media_item", "file", started, int(busy * 1e6), pid,
+                                file=os.path.join(folder_path, file))
+                    results.append((media_item, final))
+                    if len(results) % 20 == 0:  # Progress update every 20 files
+                        print(f"Progress: {len(results)}/{total} files processed")
+        finally:
+            if executor is None:
+                pool.shutdown()
+        if worker_stats:
+            print_worker_throughput(worker_stats)
     else:
-        return []
+        for i, (folder_path, file) in enumerate(tasks):
+            if i % 20 == 0:  # Progress update every 20 files
+                print(f"Progress: {i} files processed")
+            with span("get_one_media_item", "file", file=os.path.join(folder_path, file)):
+                results.append(ingest_media_item(folder_path, file, heic_cache_dir))
+    return results
+
+@profiled
+def process_media(folder, jobs=1, cache_dir=None, heic_cache_dir=None, max_depth=SCAN_DEPTH,
+                  distance_km=None, time_gap=None):
+    """Process media files in a folder with improved error handling.
+
+    Files are found by scan_media (max_depth levels of subfolders) and
+    handed to analysis while the scan is still running. With jobs > 1 the
+    files are analyzed on a process pool; results are collected in listing
+    order so the segments match the serial path.
+    With cache_dir set, files whose path, size and mtime are unchanged since
+    the last run are taken from the ingestion cache instead of being decoded.
+    HEIC photos are decoded in memory unless heic_cache_dir is given, in
+    which case JPEG conversions are kept there keyed by content.
+    distance_km and time_gap select the segmentation (see segment_items).
+    """
+    start = time.perf_counter()
+    cache = IngestCache(cache_dir) if cache_dir else None
+    results = []
+    keys = {}
+    pending = []
 
-def group_by_time(items):
-    """Group items by time with proper handling of edge cases."""
+    def pending_tasks():
+        """Scan, fill cache hits into results and yield the files that need analysis."""
+        for folder_path, file, stat_result in scan_media(folder, max_depth):
+            i = len(results)
+            results.append(None)
+            if cache is not None:
+                file_path = os.path.join(folder_path, file)
+                keys[i] = file_key(file_path, stat_result)
+                found, media_item = cache.get(keys[i])
+                if found:
+                    if media_item is not None:
+                        media_item["file"] = file_path
+                        results[i] = media_item
+                    continue
+            pending.append(i)
+            yield folder_path, file
+
+    analyzed = _analyze_tasks(pending_tasks(), jobs, heic_cache_dir)
+    for i, (media_item, final) in zip(pending, analyzed):
+        results[i] = media_item
+        if cache is not None and final:
+            cache.put(keys[i], media_item)
+
+    if cache is not None:
+        removed = cache.prune(folder, {key[0] for key in keys.values()})
+        cache.close()
+        print(f"Ingestion cache: {cache.hits} unchanged, {cache.misses} analyzed, {removed} stale entries removed")
+
+    media_items = [item for item in results if item is not None]
+    elapsed = time.perf_counter() - start
+    rate = len(pending) / elapsed if elapsed > 0 else 0.0
+    print(f"Analyzed {len(pending)} of {len(results)} files in {elapsed:.1f}s ({rate:.2f} files/s, jobs={max(1, jobs or 1)})")
+    print(f"Found {len(media_items)} valid media items")
+    return segment_items(media_items, distance_km, time_gap)
+
+def group_by_time(items, gap_seconds=TIME_GAP_THRESHOLD):
+    """Split time-ordered items into segments wherever consecutive items are over gap_seconds apart."""
     if not items:
         return []
     
@@ -277,7 +516,7 @@ def group_by_time(items):
 
     for prev, curr in zip(items, items[1:]):
         time_diff = (curr["timestamp"] - prev["timestamp"]).total_seconds()
-        if time_diff > TIME_GAP_THRESHOLD:
+        if time_diff > gap_seconds:
             segments.append(current)
             current = []
         current.append(curr)
@@ -287,6 +526,29 @@ def group_by_time(items):
     
     return segments
 
+def segment_items(items, distance_km=None, time_gap=None):
+    """Sort items by timestamp and group them into segments.
+
+    By default a segment ends at a time gap over TIME_GAP_THRESHOLD. With
+    distance_km set, segmentation is spatio-temporal: a new segment starts
+    at an item more than distance_km from every earlier item of the segment
+    or after a time gap over time_gap (default SPATIAL_TIME_GAP), so stops
+    on a road trip separate while a lunch break on a hike does not. Items
+    without GPS are placed by interpolating the positions around them in time.
+    """
+    if distance_km is not None and not distance_km > 0:
+        raise ValueError(f"distance_km must be greater than 0 (or None to split on time only): {distance_km}")
+    items = sorted(items, key=lambda item: item["timestamp"])
+    if distance_km is None:
+        return group_by_time(items, time_gap or TIME_GAP_THRESHOLD)
+    if not items:
+        return []
+    first = items[0]["timestamp"]
+    starts = spatial_segment_starts([(item["timestamp"] - first).total_seconds() for item in items],
+                                    [item.get("lat") for item in items], [item.get("lon") for item in items],
+                                    distance_km, time_gap or SPATIAL_TIME_GAP)
+    return [items[start:end] for start, end in zip(starts, starts[1:] + [len(items)])]
+
 # --- Run ---
 if __name__ == "__main__":    
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
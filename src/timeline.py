@@ -0,0 +1,96 @@
+"""
+Render settings and timeline planning.
+Kept free of moviepy, OpenCV and PIL so that config validation and
+dry-run planning do not pay for loading the render stack.
+"""
+
+from dataclasses import dataclass, replace, asdict
+
+from config.settings import (DEFAULT_FPS, DEFAULT_VIDEO_WIDTH, DEFAULT_VIDEO_HEIGHT,
+                             DEFAULT_PHOTO_DURATION, DEFAULT_COVER_DURATION,
+                             DEFAULT_AUDIO_FADE_IN, DEFAULT_AUDIO_FADE_OUT)
+
+
+@dataclass(frozen=True)
+class RenderSettings:
+    """Output and encoder parameters shared by every part of a render.
+
+    Parts encoded with the same settings have identical stream parameters,
+    which is what lets the concat demuxer join them without re-encoding.
+    """
+    size: tuple = (DEFAULT_VIDEO_WIDTH, DEFAULT_VIDEO_HEIGHT)
+    fps: float = DEFAULT_FPS
+    codec: str = "libx264"
+    audio_codec: str = "aac"
+    audio_fps: int = 44100
+    preset: str = "medium"
+    threads: int = 4
+    bg_color: tuple = (0, 128, 128)
+    photo_duration: float = DEFAULT_PHOTO_DURATION
+    cover_duration: float = DEFAULT_COVER_DURATION
+    music_volume: float = 0.2
+    music_fade_in: float = DEFAULT_AUDIO_FADE_IN
+    music_fade_out: float = DEFAULT_AUDIO_FADE_OUT
+
+    def ffmpeg_params(self):
+        # Fixed pixel format and stereo audio, whatever the sources were
+        return ["-pix_fmt", "yuv420p", "-ac", "2"]
+
+    def cache_fields(self):
+        """Settings that change how a clip is encoded.
+
+        Thread count and the music bed do not; durations are part of the
+        keys of the clips they apply to.
+        """
+        fields = asdict(self)
+        for name in ("threads", "photo_duration", "cover_duration",
+                     "music_volume", "music_fade_in", "music_fade_out"):
+            del fields[name]
+        return fields
+
+
+PREVIEW_HEIGHT = 360  # draft renders are scaled down to this height
+PREVIEW_MAX_FPS = 15
+
+
+def render_settings(config, preview=False):
+    """RenderSettings from a project config's VIDEO_WIDTH/HEIGHT, FPS, durations and music settings.
+
+    preview=True keeps the aspect ratio but renders at PREVIEW_HEIGHT, at
+    most PREVIEW_MAX_FPS, with x264's ultrafast preset: enough to check
+    ordering and captions in a fraction of the final render time.
+    """
+    settings = RenderSettings(
+        size=(int(config.get('VIDEO_WIDTH', DEFAULT_VIDEO_WIDTH)), int(config.get('VIDEO_HEIGHT', DEFAULT_VIDEO_HEIGHT))),
+        fps=config.get('FPS', DEFAULT_FPS),
+        photo_duration=config.get('PHOTO_DURATION', DEFAULT_PHOTO_DURATION),
+        cover_duration=config.get('COVER_DURATION', DEFAULT_COVER_DURATION),
+        music_volume=config.get('MUSIC_VOLUME', 0.2),
+        music_fade_in=config.get('AUDIO_FADE_IN', DEFAULT_AUDIO_FADE_IN),
+        music_fade_out=config.get('AUDIO_FADE_OUT', DEFAULT_AUDIO_FADE_OUT),
+    )
+    if not preview:
+        return settings
+    width, height = settings.size
+    scale = min(1.0, PREVIEW_HEIGHT / height)
+    # x264 with yuv420p needs even dimensions
+    size = (max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2))
+    return replace(settings, size=size, fps=min(settings.fps, PREVIEW_MAX_FPS), preset="ultrafast")
+
+
+def timeline_duration(segments, settings, max_video_duration=None):
+    """Length in seconds of the rendered vlog, covers included.
+
+    With max_video_duration, longer videos count as trimmed to that length,
+    as they will be once their highlights are picked.
+    """
+    duration = 2 * settings.cover_duration
+    for segment in segments:
+        for item in segment:
+            if item['type'] == "photo":
+                duration += settings.photo_duration
+            elif max_video_duration:
+                duration += min(item['duration'], max_video_duration)
+            else:
+                duration += item['duration']
+    return duration
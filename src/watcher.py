@@ -0,0 +1,191 @@
+"""
+Watch mode.
+Keeps the analyzed media of INPUT_FOLDER in memory, re-ingests only the
+files that were added, changed or removed, and calls back with the new
+segment plan once the folder has been quiet for a debounce interval.
+The ingest and render process pools are created once and stay warm, so a
+refresh does not pay for starting workers and importing the media stack.
+Change notifications come from watchdog when it is installed; otherwise
+the folder is polled.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.pixPicker import scan_media, _analyze_tasks, segment_items, SCAN_DEPTH
+from utils.ingestCache import IngestCache, file_key
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_SUPPORTED = True
+except ImportError:
+    WATCHDOG_SUPPORTED = False
+
+WATCH_DEBOUNCE = 2.0  # seconds without changes before re-planning
+POLL_INTERVAL = 1.0  # seconds between scans when watchdog is not installed
+
+
+def scan_folder(folder, max_depth=SCAN_DEPTH):
+    """{path: file_key} for every file scan_media finds."""
+    return {os.path.join(folder_path, file): file_key(os.path.join(folder_path, file), stat_result)
+            for folder_path, file, stat_result in scan_media(folder, max_depth)}
+
+
+class MediaIndex:
+    """In-memory analyzed media of one folder, kept in step with the ingestion cache."""
+
+    def __init__(self, folder, jobs=1, cache_dir=None, heic_cache_dir=None, max_depth=SCAN_DEPTH,
+                 distance_km=None, time_gap=None, executor=None):
+        self.folder = folder
+        self.max_depth = max_depth
+        self.distance_km = distance_km
+        self.time_gap = time_gap
+        self.jobs = jobs
+        self.executor = executor  # process pool reused by every refresh, or None
+        self.heic_cache_dir = heic_cache_dir
+        self.cache = IngestCache(cache_dir) if cache_dir else None
+        self.snapshot = {}
+        self.items = {}
+
+    def refresh(self):
+        """Rescan the folder and analyze new or changed files; returns (changed, removed) counts."""
+        snapshot = scan_folder(self.folder, self.max_depth)
+        removed = [path for path in self.snapshot if path not in snapshot]
+        for path in removed:
+            self.items.pop(path, None)
+
+        changed = [path for path, key in snapshot.items() if self.snapshot.get(path) != key]
+        pending = []
+        for path in changed:
+            if self.cache is not None:
+                found, item = self.cache.get(snapshot[path])
+                if found:
+                    if item is not None:
+                        item["file"] = path
+                    self.items[path] = item
+                    continue
+            pending.append(path)
+
+        analyzed = _analyze_tasks([os.path.split(path) for path in pending], self.jobs, self.heic_cache_dir,
+                                  self.executor)
+        for path, (item, final) in zip(pending, analyzed):
+            self.items[path] = item
+            if self.cache is not None and final:
+                self.cache.put(snapshot[path], item)
+        if self.cache is not None:
+            if removed or not self.snapshot:
+                # Forget deleted files, including those removed while not watching
+                self.cache.prune(self.folder, {key[0] for key in snapshot.values()})
+            self.cache.commit()
+        self.snapshot = snapshot
+        return len(changed), len(removed)
+
+    def segments(self):
+        return segment_items([item for item in self.items.values() if item is not None],
+                             self.distance_km, self.time_gap)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+
+class ChangeSignal:
+    """Set by watchdog events or by polling when the folder may have changed."""
+
+    def __init__(self, folder, max_depth=SCAN_DEPTH):
+        self.folder = folder
+        self.max_depth = max_depth
+        self.event = threading.Event()
+        self.last_scan = None
+        self.observer = None
+        if WATCHDOG_SUPPORTED:
+            signal = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    signal.event.set()
+
+            self.observer = Observer()
+            self.observer.schedule(Handler(), folder, recursive=True)
+            self.observer.start()
+
+    def wait(self, timeout):
+        """True when something under the folder changed within timeout seconds."""
+        if self.observer is not None:
+            changed = self.event.wait(timeout)
+            self.event.clear()
+            return changed
+        time.sleep(timeout)
+        scan = scan_folder(self.folder, self.max_depth)
+        changed = self.last_scan is not None and scan != self.last_scan
+        self.last_scan = scan
+        return changed
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+
+def watch_folder(folder, on_change, jobs=1, cache_dir=None, heic_cache_dir=None, debounce=WATCH_DEBOUNCE,
+                 max_depth=SCAN_DEPTH, distance_km=None, time_gap=None, render_jobs=None, max_open_videos=None):
+    """Call on_change(segments, executor) for the current folder, then again after every burst of changes.
+
+    A burst ends when no change has been seen for debounce seconds, so
+    copying in a batch of files triggers one refresh. With jobs > 1 files
+    are analyzed on a pool of jobs workers, and with render_jobs set
+    on_change gets a pool of render_jobs workers to render on (one pool
+    serves both when the sizes match, as in batch mode). Both live until
+    watching stops. Runs until interrupted with Ctrl+C.
+    """
+    from src.composer import set_max_open_videos, MAX_OPEN_VIDEOS
+    initargs = (max_open_videos or MAX_OPEN_VIDEOS,)
+    ingest_pool = render_pool = None
+    if jobs and jobs > 1:
+        ingest_pool = ProcessPoolExecutor(max_workers=jobs, initializer=set_max_open_videos, initargs=initargs)
+    if render_jobs and render_jobs == jobs and ingest_pool is not None:
+        render_pool = ingest_pool
+    elif render_jobs:
+        render_pool = ProcessPoolExecutor(max_workers=render_jobs, initializer=set_max_open_videos, initargs=initargs)
+    index = MediaIndex(folder, jobs, cache_dir, heic_cache_dir, max_depth, distance_km, time_gap, ingest_pool)
+    signal = ChangeSignal(folder, max_depth)
+    mode = "notifications" if signal.observer is not None else f"polling every {POLL_INTERVAL:.0f}s"
+
+    def update(segments):
+        try:
+            on_change(segments, render_pool)
+        except Exception as e:
+            # Keep watching: the next change may fix whatever failed
+            print(f"❌ Error: {e}")
+
+    try:
+        index.refresh()
+        signal.last_scan = index.snapshot
+        update(index.segments())
+        print(f"\nWatching {folder} ({mode}); press Ctrl+C to stop")
+        while True:
+            if not signal.wait(POLL_INTERVAL):
+                continue
+            # Debounce: wait until the folder has been quiet for a while
+            while signal.wait(debounce):
+                pass
+            start = time.perf_counter()
+            changed, removed = index.refresh()
+            if not changed and not removed:
+                continue
+            print(f"\n{changed} files added or changed, {removed} removed "
+                  f"(re-ingested in {time.perf_counter() - start:.1f}s)")
+            update(index.segments())
+            print(f"\nWatching {folder}")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        signal.stop()
+        index.close()
+        if ingest_pool is not None:
+            ingest_pool.shutdown()
+        if render_pool is not None and render_pool is not ingest_pool:
+            render_pool.shutdown()
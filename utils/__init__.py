@@ -3,7 +3,22 @@ Utility modules for VBlogger
 Helper functions and utilities for video processing.
 """
 
-from .formatHelper import *
-from .handleAspectRatio import *
+import importlib
 
-__all__ = ['formatHelper', 'handleAspectRatio'] 
\ No newline at end of file
+_EXPORTING_MODULES = ('formatHelper', 'handleAspectRatio')
+
+
+def __getattr__(name):
+    # formatHelper and handleAspectRatio pull in moviepy, PIL and NumPy, so
+    # they (and the names they export) are imported on first use only;
+    # light helpers such as utils.ingestCache can be imported on their own.
+    if name in _EXPORTING_MODULES:
+        return importlib.import_module(f".{name}", __name__)
+    for module_name in _EXPORTING_MODULES:
+        module = importlib.import_module(f".{module_name}", __name__)
+        if not name.startswith('_') and hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['formatHelper', 'handleAspectRatio']
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Near-duplicate photo removal.
+Photos carry a 64-bit perceptual hash (computed during ingestion). Within a
+segment, photos taken close together whose hashes are within a Hamming
+radius count as the same shot, and only the sharpest is kept. A multi-index
+over hash chunks finds those matches without comparing all pairs.
+"""
+
+try:
+    import imagehash
+    PHASH_SUPPORTED = True
+except ImportError:
+    PHASH_SUPPORTED = False
+
+DEDUP_MAX_DISTANCE = 6  # Hamming distance (of 64 bits) treated as "same shot"
+DEDUP_TIME_WINDOW = 10 * 60  # seconds; photos further apart are never near-duplicates
+PHASH_DRAFT_SIZE = (256, 256)  # JPEGs are DCT-decoded near this size before hashing
+
+
+def perceptual_hash(img):
+    """Hex pHash of a freshly opened PIL image, or None when ImageHash is not installed.
+
+    JPEGs are put in draft mode first, so only a small version is decoded;
+    the image must not have been loaded yet for that to take effect.
+    """
+    if not PHASH_SUPPORTED:
+        return None
+    if img.format == "JPEG":
+        img.draft("L", PHASH_DRAFT_SIZE)
+    return str(imagehash.phash(img.convert("L")))
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class MultiIndex:
+    """Multi-index hashing over 64-bit integer hashes with Hamming distance.
+
+    Each hash is split into radius + 1 chunks and filed under every chunk
+    value. Two hashes within radius differ in at most radius chunks, so by
+    the pigeonhole principle they agree exactly on at least one: a query
+    only compares the hashes that share a chunk with it. Entries are filed
+    under a scope as well, and queries only look in the scopes they name.
+    """
+
+    def __init__(self, radius, bits=64):
+        self.radius = radius
+        count = radius + 1
+        bounds = [bits * i // count for i in range(count + 1)]
+        self.chunks = [(low, (1 << (high - low)) - 1) for low, high in zip(bounds, bounds[1:])]
+        self.buckets = {}  # (scope, chunk number, chunk value) -> positions in keys/values
+        self.keys = []
+        self.values = []
+
+    def add(self, key, value, scope=None):
+        position = len(self.keys)
+        self.keys.append(key)
+        self.values.append(value)
+        for n, (shift, mask) in enumerate(self.chunks):
+            bucket = (scope, n, (key >> shift) & mask)
+            if bucket in self.buckets:
+                self.buckets[bucket].append(position)
+            else:
+                self.buckets[bucket] = [position]
+
+    def query(self, key, scopes=(None,)):
+        """Return the values of every hash within radius of key, each once."""
+        found = set()
+        for n, (shift, mask) in enumerate(self.chunks):
+            chunk = (key >> shift) & mask
+            for scope in scopes:
+                for position in self.buckets.get((scope, n, chunk), ()):
+                    if position not in found and hamming(key, self.keys[position]) <= self.radius:
+                        found.add(position)
+        return [self.values[position] for position in sorted(found)]
+
+
+def remove_near_duplicates(segments, max_distance=DEDUP_MAX_DISTANCE, time_window=DEDUP_TIME_WINDOW):
+    """Drop near-duplicate photos from the segments, keeping the sharpest of each shot.
+
+    Photos are visited sharpest first. One is dropped when a photo already
+    kept in the same segment, taken at most time_window seconds apart, has
+    a hash within max_distance; otherwise it is kept. Photos are only
+    compared with kept ones, so a chain of small differences (A~B~C) never
+    drops a photo that is not close to the one kept in its place. Videos
+    and photos without a hash are always kept. Segment and item order are
+    preserved; segments left empty are removed.
+    """
+    photos = [(number, item) for number, segment in enumerate(segments) for item in segment
+              if item["type"] == "photo" and item.get("phash")]
+    photos.sort(key=lambda photo: -(photo[1].get("sharpness") or 0.0))
+
+    # Kept photos are filed by segment and time bin; a match can only be in the same or a neighbouring bin
+    index = MultiIndex(max_distance)
+    times = []
+    dropped = set()
+    for number, item in photos:
+        key = int(item["phash"], 16)
+        seconds = item["timestamp"].timestamp()
+        time_bin = int(seconds // time_window) if time_window > 0 else 0
+        scopes = [(number, b) for b in (time_bin - 1, time_bin, time_bin + 1)]
+        if any(abs(seconds - times[i]) <= time_window for i in index.query(key, scopes)):
+            dropped.add(id(item))
+            continue
+        index.add(key, len(times), (number, time_bin))
+        times.append(seconds)
+
+    result = []
+    for segment in segments:
+        kept = [item for item in segment if id(item) not in dropped]
+        if kept:
+            result.append(kept)
+    print(f"Near-duplicate removal: dropped {len(dropped)} of {len(photos)} photos")
+    return result
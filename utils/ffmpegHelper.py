@@ -0,0 +1,77 @@
+"""
+Locate the ffmpeg / ffprobe executables.
+Order: VBLOGGER_FFMPEG / VBLOGGER_FFPROBE environment variables, the PATH,
+then the ffmpeg binary bundled with imageio-ffmpeg (ffprobe is looked up
+next to whichever ffmpeg was found), plus small wrappers for the ffmpeg
+jobs that need no frame-level Python work (stream-copy concat, music bed mix).
+"""
+
+import os
+import shutil
+import subprocess
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_ffmpeg_path():
+    """Return the ffmpeg executable to use, or None if none is available."""
+    path = os.environ.get("VBLOGGER_FFMPEG") or shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_ffprobe_path():
+    """Return the ffprobe executable to use, or None if none is available."""
+    path = os.environ.get("VBLOGGER_FFPROBE") or shutil.which("ffprobe")
+    if path:
+        return path
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg:
+        name = "ffprobe.exe" if ffmpeg.lower().endswith(".exe") else "ffprobe"
+        candidate = os.path.join(os.path.dirname(ffmpeg), name)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def run_ffmpeg(args):
+    """Run ffmpeg with the given arguments; raise RuntimeError with its stderr on failure."""
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found; install it or set VBLOGGER_FFMPEG")
+    result = subprocess.run([ffmpeg, "-y", "-hide_banner", "-loglevel", "error", *args],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def concat_copy(parts, output_file, extra_args=()):
+    """Join files with identical stream parameters through the concat demuxer, without re-encoding."""
+    list_file = f"{output_file}.concat.txt"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for part in parts:
+            escaped = os.path.abspath(part).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_file, "-c", "copy", *extra_args, output_file])
+    finally:
+        os.remove(list_file)
+
+
+def mux_music_bed(video_file, bed_file, output_file, audio_codec="aac"):
+    """Mix a pre-rendered music bed under a video's audio; the video stream is copied."""
+    run_ffmpeg([
+        "-i", video_file,
+        "-i", bed_file,
+        "-filter_complex", "[0:a][1:a]amix=inputs=2:duration=first:normalize=0[a]",
+        "-map", "0:v", "-map", "[a]",
+        "-c:v", "copy", "-c:a", audio_codec,
+        "-movflags", "+faststart",
+        output_file,
+    ])
@@ -1,5 +1,7 @@
 import os
 import re
+from functools import lru_cache
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import tempfile
 from moviepy.editor import ImageClip, CompositeVideoClip
@@ -18,15 +20,35 @@ def filename_to_subtitle(filename):
 
 PHOTO_DURATION = 3  # seconds per photo
 FONT = "Arial-Bold"
+FONT_FILE = "arial.ttf"
+BASE_OVERLAY_WIDTH = 1280  # overlay layouts are designed at this width and scaled to the output
 
-def generate_subtitle_image(text, size=(1280, 100), font_size=40):
-    img = Image.new("RGBA", size, (0, 0, 0, 128))  # semi-transparent black box
-    draw = ImageDraw.Draw(img)
-
+@lru_cache(maxsize=None)
+def load_font(font_size):
+    """Load the overlay font once per size."""
     try:
-        font = ImageFont.truetype("arial.ttf", font_size)
+        return ImageFont.truetype(FONT_FILE, font_size)
     except IOError:
-        font = ImageFont.load_default()
+        return ImageFont.load_default()
+
+def subtitle_layout(width):
+    """(size, font_size) of the subtitle bar for an output `width` pixels wide."""
+    scale = width / BASE_OVERLAY_WIDTH
+    return (width, round(100 * scale)), round(40 * scale)
+
+def _save_png(array, output_dir=None):
+    """Write an overlay array to a new PNG (created securely) and return its path."""
+    fd, path = tempfile.mkstemp(suffix=".png", dir=output_dir)
+    os.close(fd)
+    Image.fromarray(array).save(path)
+    return path
+
+@lru_cache(maxsize=512)
+def render_subtitle_overlay(text, size=(1280, 100), font_size=40):
+    """Subtitle bar as a read-only RGBA array, cached by (text, size, font_size)."""
+    img = Image.new("RGBA", size, (0, 0, 0, 128))  # semi-transparent black box
+    draw = ImageDraw.Draw(img)
+    font = load_font(font_size)
 
     # Use textbbox instead of deprecated textsize
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -36,46 +58,63 @@ def generate_subtitle_image(text, size=(1280, 100), font_size=40):
     position = ((size[0] - text_width) // 2, (size[1] - text_height) // 2)
     draw.text(position, text, font=font, fill=(255, 255, 255, 255))
 
-    temp_path = tempfile.mktemp(suffix=".png")
-    img.save(temp_path)
-    return temp_path
+    array = np.asarray(img)
+    array.flags.writeable = False
+    return array
+
+def generate_subtitle_image(text, size=(1280, 100), font_size=40, output_dir=None):
+    """Write the subtitle bar to a PNG (for consumers that need a file) and return its path."""
+    return _save_png(render_subtitle_overlay(text, size, font_size), output_dir)
 
 def create_subtitled_clip(clip, subtitle_text, duration) -> CompositeVideoClip:
-    subtitle_img_path = generate_subtitle_image(subtitle_text)
-    subtitle_img = ImageClip(subtitle_img_path).set_duration(duration).set_position(("center", "bottom"))
+    # Rendered at the clip's own width, so nothing is rescaled while composing
+    size, font_size = subtitle_layout(clip.w)
+    overlay = render_subtitle_overlay(subtitle_text, size, font_size)
+    subtitle_img = ImageClip(overlay).set_duration(duration).set_position(("center", "bottom"))
     return CompositeVideoClip([clip, subtitle_img])
 
-def generate_title_image(title, subtitle, size=(1280, 720), title_size=80, subtitle_size=50):
-    img = Image.new("RGBA", size, (0, 128, 128, 255))  # solid teal background
+def bake_subtitle(image, subtitle_text):
+    """Paste the subtitle bar onto an RGB PIL image in place, where create_subtitled_clip puts it."""
+    size, font_size = subtitle_layout(image.width)
+    overlay = Image.fromarray(render_subtitle_overlay(subtitle_text, size, font_size))
+    image.paste(overlay, ((image.width - size[0]) // 2, image.height - size[1]), overlay)
+    return image
+
+@lru_cache(maxsize=32)
+def render_title_overlay(title, subtitle, size=(1280, 720)):
+    """Cover image as a read-only RGB array, cached by (title, subtitle, size).
+
+    The 1280x720 layout (80/50 px text) is scaled to size.
+    """
+    scale = size[0] / BASE_OVERLAY_WIDTH
+    img = Image.new("RGB", size, (0, 128, 128))  # solid teal background
     draw = ImageDraw.Draw(img)
 
-    try:
-        title_font = ImageFont.truetype("arial.ttf", title_size)
-        subtitle_font = ImageFont.truetype("arial.ttf", subtitle_size)
-    except IOError:
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
+    title_font = load_font(round(80 * scale))
+    subtitle_font = load_font(round(50 * scale))
 
     # Title
     title_bbox = draw.textbbox((0, 0), title, font=title_font)
     title_width = title_bbox[2] - title_bbox[0]
-    title_position = ((size[0] - title_width) // 2, size[1] // 2 - 80)
+    title_position = ((size[0] - title_width) // 2, size[1] // 2 - round(80 * scale))
 
     # Subtitle
     subtitle_bbox = draw.textbbox((0, 0), subtitle, font=subtitle_font)
     subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-    subtitle_position = ((size[0] - subtitle_width) // 2, size[1] // 2 + 20)
+    subtitle_position = ((size[0] - subtitle_width) // 2, size[1] // 2 + round(20 * scale))
 
-    draw.text(title_position, title, font=title_font, fill=(255, 255, 255, 255))
-    draw.text(subtitle_position, subtitle, font=subtitle_font, fill=(180, 180, 180, 255))
+    draw.text(title_position, title, font=title_font, fill=(255, 255, 255))
+    draw.text(subtitle_position, subtitle, font=subtitle_font, fill=(180, 180, 180))
 
-    temp_path = tempfile.mktemp(suffix=".png")
-    img.save(temp_path)
-    return temp_path
+    array = np.asarray(img)
+    array.flags.writeable = False
+    return array
+
+def generate_title_image(title, subtitle, size=(1280, 720), output_dir=None):
+    """Write the cover image to a PNG and return its path."""
+    return _save_png(render_title_overlay(title, subtitle, size), output_dir)
 
 
 def create_cover_clip(title, subtitle, duration=4, size=(1280, 720)):
-    image_path = generate_title_image(title, subtitle, size=size)
-    clip = ImageClip(image_path).set_duration(duration)
+    clip = ImageClip(render_title_overlay(title, subtitle, size)).set_duration(duration)
     return clip
-
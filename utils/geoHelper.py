@@ -0,0 +1,88 @@
+"""
+GPS helpers for spatio-temporal segmentation.
+Positions of items without GPS are interpolated in time from the located
+items around them, and segments are split where the media moves more than
+a distance from everywhere the segment has been, using a grid of
+distance-sized cells so each item is only compared with its neighborhood.
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.195  # along a meridian
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def interpolate_positions(times, lat, lon, max_gap_seconds):
+    """(lat, lon) lists where items without GPS get a position interpolated in time.
+
+    times are ascending seconds; lat and lon hold None where an item has no
+    GPS. The position is interpolated linearly between the nearest located
+    items before and after, or copied from the nearest one at either end.
+    Items more than max_gap_seconds from any located item stay NaN.
+    """
+    t = np.asarray(times, dtype=np.float64)
+    lat = np.array([np.nan if value is None else value for value in lat], dtype=np.float64)
+    lon = np.array([np.nan if value is None else value for value in lon], dtype=np.float64)
+    unknown = np.isnan(lat) | np.isnan(lon)
+    located, missing = np.flatnonzero(~unknown), np.flatnonzero(unknown)
+    if len(located) and len(missing):
+        lat[missing] = np.interp(t[missing], t[located], lat[located])
+        lon[missing] = np.interp(t[missing], t[located], lon[located])
+        # Distance in time to the nearest located item on either side
+        after = np.minimum(np.searchsorted(t[located], t[missing]), len(located) - 1)
+        before = np.maximum(after - 1, 0)
+        nearest = np.minimum(np.abs(t[located][after] - t[missing]), np.abs(t[missing] - t[located][before]))
+        too_far = missing[nearest > max_gap_seconds]
+        lat[too_far] = np.nan
+        lon[too_far] = np.nan
+    return lat.tolist(), lon.tolist()
+
+
+def spatial_segment_starts(times, lat, lon, distance_km, gap_seconds):
+    """Index of the first item of every spatio-temporal segment of time-sorted items.
+
+    A new segment starts after a time gap over gap_seconds, or at an item
+    more than distance_km away from every located item already in the
+    current segment. Items of the segment are kept in a grid of distance_km
+    cells, so each item is only compared with the points in its 3x3 cell
+    neighborhood: linear time overall. Items without a (possibly
+    interpolated) position are split on time only.
+    """
+    if not times:
+        return []
+    lat, lon = interpolate_positions(times, lat, lon, gap_seconds)
+
+    starts = []
+    grid = {}
+    scale = KM_PER_DEGREE
+    previous = None
+    for i, t in enumerate(times):
+        if previous is None or t - previous > gap_seconds:
+            starts.append(i)
+            grid = {}
+        previous = t
+        if math.isnan(lat[i]):
+            continue
+        row = math.floor(lat[i] * KM_PER_DEGREE / distance_km)
+        if grid:
+            col = int(lon[i] * scale // distance_km)
+            near = any(haversine_km(lat[i], lon[i], lat[j], lon[j]) <= distance_km
+                       for r in (row, row - 1, row + 1) for c in (col, col - 1, col + 1)
+                       for j in grid.get((r, c), ()))
+            if not near:
+                starts.append(i)
+                grid = {}
+        if not grid:
+            # Cells are distance_km wide at the latitude where the segment starts
+            scale = KM_PER_DEGREE * max(math.cos(math.radians(lat[i])), 0.01)
+        grid.setdefault((row, int(lon[i] * scale // distance_km)), []).append(i)
+    return starts
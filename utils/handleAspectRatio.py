@@ -1,4 +1,6 @@
 
+from PIL import Image
+
 FFPROBE_PATH  = r"D:\projects\tools\ffmpeg-7.1.1-essentials_build\bin\ffprobe.exe"  
 TARGET_RATIO = 16/9
 
@@ -17,4 +19,20 @@ def fit_clip_to_size(clip, target_size=(1920,1080), bg_color=(0, 0, 0)):
         color=bg_color,
         pos='center'
     )
-    return padded
\ No newline at end of file
+    return padded
+
+
+def fit_image_to_size(image, target_size=(1920,1080), bg_color=(0, 0, 0)):
+    """Still-image counterpart of fit_clip_to_size: scale a PIL image into target_size and letterbox it."""
+    target_w, target_h = target_size
+    img_w, img_h = image.size
+
+    scale = min(target_w / img_w, target_h / img_h)
+    new_w = int(img_w * scale)
+    new_h = int(img_h * scale)
+
+    resized = image.convert("RGB").resize((new_w, new_h), Image.LANCZOS)
+
+    canvas = Image.new("RGB", target_size, tuple(bg_color))
+    canvas.paste(resized, ((target_w - new_w) // 2, (target_h - new_h) // 2))
+    return canvas
@@ -0,0 +1,201 @@
+"""
+Highlight selection for long videos.
+Each video is sampled cheaply: only its keyframes are decoded, straight to
+small grayscale frames (falling back to a few low-resolution frames per
+second when a file has too few keyframes). The samples are scored for
+motion, sharpness and exposure with vectorized NumPy, and the
+VIDEO_DURATION-long window with the best mean score becomes the clip. The
+scores are kept in <cache_dir>/highlight_index.sqlite by the source's
+content hash, so the window can be re-chosen for another duration (or a
+renamed copy) without sampling again.
+"""
+
+import os
+import re
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.ffmpegHelper import get_ffmpeg_path
+from utils.renderCache import open_hash_db, cached_content_hash
+
+INDEX_FILENAME = "highlight_index.sqlite"
+SAMPLE_SIZE = (160, 90)  # frames are scored at this size; aspect ratio does not matter for the scores
+SAMPLE_FPS = 2  # fallback sampling rate when keyframes are too sparse
+MIN_KEYFRAMES = 8
+WEIGHTS = {"motion": 0.4, "sharpness": 0.4, "exposure": 0.2}
+
+# Bump when sampling or scoring changes so cached scores are recomputed.
+HIGHLIGHT_VERSION = 2
+
+_PTS_RE = re.compile(rb"pts_time:\s*(-?[\d.]+)")
+
+
+def sample_frames(path, keyframes_only=True):
+    """Return (times, frames): sample timestamps in seconds and (n, h, w) uint8 grayscale frames.
+
+    ffmpeg decodes only keyframes (or SAMPLE_FPS frames per second) and
+    scales them down before they reach Python; showinfo reports each
+    frame's timestamp.
+    """
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found; install it or set VBLOGGER_FFMPEG")
+    width, height = SAMPLE_SIZE
+    if keyframes_only:
+        args = ["-skip_frame", "nokey", "-i", path, "-vf", f"scale={width}:{height},format=gray,showinfo"]
+    else:
+        args = ["-i", path, "-vf", f"fps={SAMPLE_FPS},scale={width}:{height},format=gray,showinfo"]
+    # The rawvideo muxer is constant frame rate: without passthrough ffmpeg
+    # duplicates the sparse keyframes to fill the gaps between them
+    result = subprocess.run([ffmpeg, "-hide_banner", "-loglevel", "info", *args,
+                             "-an", "-fps_mode", "passthrough", "-f", "rawvideo", "-pix_fmt", "gray", "-"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()[-500:]}")
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    times = np.array([float(t) for t in _PTS_RE.findall(result.stderr)])
+    count, remainder = divmod(len(frames), width * height)
+    if remainder or count != len(times):
+        raise RuntimeError(f"ffmpeg returned {count} frames for {len(times)} sampled timestamps")
+    return times, frames.reshape(count, height, width)
+
+
+def score_frames(frames):
+    """Score each frame in [0, 1] from motion, sharpness and exposure, vectorized over the batch.
+
+    Motion is the mean absolute difference to the previous sample,
+    sharpness the variance of the Laplacian, and exposure how close the
+    mean brightness is to mid-grey, less the share of clipped pixels.
+    Motion and sharpness are scaled by their 95th percentile in the video.
+    """
+    f = frames.astype(np.float32)
+    laplacian = (f[:, 1:-1, 2:] + f[:, 1:-1, :-2] + f[:, 2:, 1:-1] + f[:, :-2, 1:-1]
+                 - 4 * f[:, 1:-1, 1:-1])
+    sharpness = laplacian.var(axis=(1, 2))
+    motion = np.abs(np.diff(f, axis=0)).mean(axis=(1, 2))
+    motion = np.concatenate((motion[:1], motion)) if len(motion) else np.zeros(len(f), np.float32)
+    brightness = f.mean(axis=(1, 2)) / 255
+    clipped = ((frames < 8) | (frames > 247)).mean(axis=(1, 2))
+    exposure = np.clip(1 - 2 * np.abs(brightness - 0.5) - clipped, 0, 1)
+
+    def scaled(values):
+        top = np.percentile(values, 95) if len(values) else 0
+        return np.clip(values / top, 0, 1) if top > 0 else np.zeros_like(values)
+
+    return (WEIGHTS["motion"] * scaled(motion) + WEIGHTS["sharpness"] * scaled(sharpness)
+            + WEIGHTS["exposure"] * exposure)
+
+
+def best_window(times, scores, duration, window):
+    """Start time of the window-second span of [0, duration] with the best mean sample score."""
+    if duration <= window or not len(times):
+        return 0.0
+    order = np.argsort(times)
+    times, scores = times[order], scores[order]
+    # Candidate windows start at every sample (and end at the clip end)
+    starts = np.clip(np.concatenate((times, [duration - window])), 0, duration - window)
+    cumulative = np.concatenate(([0.0], np.cumsum(scores)))
+    first = np.searchsorted(times, starts, side="left")
+    last = np.searchsorted(times, starts + window, side="right")
+    counts = last - first
+    means = np.where(counts > 0, (cumulative[last] - cumulative[first]) / np.maximum(counts, 1), -1.0)
+    return float(starts[np.argmax(means)])
+
+
+def sample_scores(path):
+    """(times, scores) for a video: keyframes, or low-fps frames when keyframes are too sparse."""
+    times, frames = sample_frames(path, keyframes_only=True)
+    if len(times) < MIN_KEYFRAMES:
+        times, frames = sample_frames(path, keyframes_only=False)
+    return times, score_frames(frames)
+
+
+class HighlightCache:
+    """Index of sample scores keyed by source content hash."""
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = open_hash_db(os.path.join(cache_dir, INDEX_FILENAME))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS highlight_scores ("
+            " sha1 TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " times TEXT NOT NULL,"
+            " scores TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def content_hash(self, path):
+        return cached_content_hash(self.conn, path)
+
+    def lookup(self, sha1):
+        """Return (times, scores) for a source hash, or None if it has not been sampled."""
+        row = self.conn.execute(
+            "SELECT version, times, scores FROM highlight_scores WHERE sha1 = ?", (sha1,)
+        ).fetchone()
+        if row is None or row[0] != HIGHLIGHT_VERSION:
+            return None
+        return np.array(json.loads(row[1])), np.array(json.loads(row[2]))
+
+    def put(self, sha1, times, scores):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO highlight_scores (sha1, version, times, scores) VALUES (?, ?, ?, ?)",
+            (sha1, HIGHLIGHT_VERSION,
+             json.dumps(np.round(times, 3).tolist()), json.dumps(np.round(scores, 4).tolist())),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def attach_highlights(segments, window, cache_dir=None, jobs=4):
+    """Return segments whose videos longer than window seconds are trimmed to their best window.
+
+    Trimmed items are copies with 'clip_start' set, 'duration' set to window
+    and the full length kept in 'source_duration'. Videos that cannot be
+    sampled keep their full length.
+    """
+    videos = {item['file']: item['duration'] for segment in segments for item in segment
+              if item['type'] == "video" and item['duration'] > window}
+    if not videos:
+        return segments
+
+    samples, hashes = {}, {}
+    cache = HighlightCache(cache_dir) if cache_dir else None
+    try:
+        if cache is not None:
+            for path in videos:
+                hashes[path] = cache.content_hash(path)
+                samples[path] = cache.lookup(hashes[path])
+        missing = [path for path in videos if samples.get(path) is None]
+
+        def sample(path):
+            try:
+                return path, sample_scores(path)
+            except Exception as e:
+                print(f"Warning: Could not pick a highlight from {path}: {e}")
+                return path, None
+
+        if missing:
+            print(f"Sampling {len(missing)} videos for highlights ({len(videos) - len(missing)} cached)")
+        # Each sampler waits on its own ffmpeg process; results are stored from this thread
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for path, result in executor.map(sample, missing):
+                samples[path] = result
+                if result is not None and cache is not None:
+                    cache.put(hashes[path], *result)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    starts = {path: best_window(*samples[path], duration, window)
+              for path, duration in videos.items() if samples.get(path) is not None}
+    print(f"Trimmed {len(starts)} videos to {window:.1f}s highlights")
+    return [[{**item, "clip_start": starts[item['file']], "duration": window, "source_duration": item['duration']}
+             if item['file'] in starts else item
+             for item in segment]
+            for segment in segments]
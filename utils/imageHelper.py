@@ -0,0 +1,59 @@
+"""
+Image loading helpers.
+Decodes HEIC/HEIF in-process through pillow-heif (when installed) so photos
+can be analyzed and composed straight from memory, and keeps an optional
+content-addressed cache of JPEG conversions.
+"""
+
+import os
+import hashlib
+
+from PIL import Image
+
+HEIF_EXTS = (".heic", ".heif")
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_SUPPORTED = True
+except ImportError:
+    HEIF_SUPPORTED = False
+
+
+def is_heif(path):
+    return path.lower().endswith(HEIF_EXTS)
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """Hex SHA-1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def heif_cache_path(path, cache_dir):
+    """Location of the cached JPEG conversion for a HEIC file, keyed by its content."""
+    return os.path.join(cache_dir, "heic", file_sha1(path) + ".jpg")
+
+
+def convert_heif_cached(path, cache_dir, quality=95):
+    """Convert a HEIC/HEIF file to JPEG once and return the cached path.
+
+    Identical content maps to the same file, so renamed or copied photos
+    reuse an existing conversion. EXIF is carried over.
+    """
+    output_file = heif_cache_path(path, cache_dir)
+    if os.path.exists(output_file):
+        return output_file
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with Image.open(path) as img:
+        exif = img.info.get("exif")
+        rgb = img.convert("RGB")
+    # Write to a temporary name first so parallel workers never see half a file
+    temp_file = f"{output_file}.{os.getpid()}.tmp"
+    rgb.save(temp_file, "JPEG", quality=quality, **({"exif": exif} if exif else {}))
+    os.replace(temp_file, output_file)
+    return output_file
@@ -0,0 +1,95 @@
+"""
+Persistent ingestion cache.
+Stores the result of pixPicker.ingest_media_item in SQLite, keyed by file
+path, size and mtime, so unchanged files are not decoded again. Failed
+analyses are not stored, so those files are retried on the next run.
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+CACHE_FILENAME = "ingest_cache.sqlite"
+
+# Bump when the shape of the analysis dict changes so old rows are re-analyzed.
+ANALYSIS_VERSION = 11
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def file_key(path, stat_result=None):
+    """Return (normalized absolute path, size, mtime_ns) for a file."""
+    st = stat_result or os.stat(path)
+    return os.path.normcase(os.path.abspath(path)), st.st_size, st.st_mtime_ns
+
+
+class IngestCache:
+    """SQLite-backed map from (path, size, mtime) to an analyzed media item.
+
+    A cached value of None means the file was analyzed and rejected
+    (blurry, too short, unreadable), which is remembered as well.
+    """
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, CACHE_FILENAME)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " item TEXT)"
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (found, item) for a file_key tuple."""
+        path, size, mtime_ns = key
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, version, item FROM media WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns or row[2] != ANALYSIS_VERSION:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, (json.loads(row[3], object_hook=_decode) if row[3] is not None else None)
+
+    def put(self, key, item):
+        path, size, mtime_ns = key
+        payload = json.dumps(item, default=_encode) if item is not None else None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO media (path, size, mtime_ns, version, item) VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, ANALYSIS_VERSION, payload),
+        )
+
+    def prune(self, folder, seen_paths):
+        """Delete entries under folder whose files were not seen in the latest scan."""
+        prefix = os.path.join(os.path.normcase(os.path.abspath(folder)), "")
+        rows = self.conn.execute(
+            "SELECT path FROM media WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        stale = [(path,) for (path,) in rows if path not in seen_paths]
+        self.conn.executemany("DELETE FROM media WHERE path = ?", stale)
+        return len(stale)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
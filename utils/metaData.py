@@ -5,12 +5,13 @@ from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
 
-import exifread
 from PIL import Image
-from hachoir.parser import createParser
-from hachoir.metadata import extractMetadata
 import subprocess
 import json
+import re
+from fractions import Fraction
+
+from utils.ffmpegHelper import get_ffmpeg_path, get_ffprobe_path
 
 PHOTO_EXTS = (".jpg", ".jpeg", ".png", ".heic", ".heif")
 VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv")
@@ -41,8 +42,17 @@ class VideoMetadata:
     frame_rate: Optional[float] = None
     bit_rate: Optional[int] = None
     audio_codec: Optional[str] = None
+    rotation: int = 0
+    creation_time: Optional[datetime] = None
     other_metadata: Dict[str, Any] = field(default_factory=dict)
 
+    @property
+    def display_size(self):
+        """(width, height) as the video is shown, i.e. after applying rotation."""
+        if self.rotation in (90, 270):
+            return self.height, self.width
+        return self.width, self.height
+
 @dataclass
 class MediaMetadata:
     general: GeneralMetadata
@@ -67,6 +77,8 @@ def get_general_metadata(path: Path) -> GeneralMetadata:
     )
 
 def get_image_metadata(path: Path) -> ImageMetadata:
+    import exifread  # only this full-metadata dump needs it; ingestion parses EXIF with piexif
+
     metadata = ImageMetadata()
     try:
         with Image.open(path) as img:
@@ -81,40 +93,114 @@ def get_image_metadata(path: Path) -> ImageMetadata:
         print(f"Error reading image metadata: {e}")
     return metadata
 
-def get_video_metadata(path: Path) -> VideoMetadata:
+def _parse_creation_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO container creation_time into a naive local datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def _parse_rate(value: Optional[str]) -> Optional[float]:
+    try:
+        rate = Fraction(value)
+        return float(rate) if rate else None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+def _probe_with_ffprobe(ffprobe: str, path: Path) -> Optional[VideoMetadata]:
+    """Header-only probe through ffprobe's JSON output."""
+    cmd = [
+        ffprobe,
+        "-v", "quiet",
+        "-print_format", "json",
+        "-show_format",
+        "-show_streams",
+        str(path)
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        return None
+
+    data = json.loads(result.stdout)
     metadata = VideoMetadata()
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == 'video' and metadata.codec is None:
+            metadata.codec = stream.get('codec_name')
+            metadata.width = stream.get('width')
+            metadata.height = stream.get('height')
+            metadata.frame_rate = _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate'))
+            metadata.bit_rate = int(stream.get('bit_rate', 0) or 0)
+            rotation = stream.get('tags', {}).get('rotate')
+            for side_data in stream.get('side_data_list', []):
+                if 'rotation' in side_data:
+                    rotation = side_data['rotation']
+            metadata.rotation = int(round(float(rotation))) % 360 if rotation is not None else 0
+        elif stream.get('codec_type') == 'audio' and metadata.audio_codec is None:
+            metadata.audio_codec = stream.get('codec_name')
+
+    fmt = data.get("format", {})
+    metadata.duration = float(fmt.get('duration', 0))
+    metadata.creation_time = _parse_creation_time(fmt.get('tags', {}).get('creation_time'))
+    metadata.other_metadata = fmt
+    return metadata
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_RE = re.compile(r"Stream #\S+.*?: Video: (\w+).*?, (\d{2,5})x(\d{2,5})")
+_AUDIO_RE = re.compile(r"Stream #\S+.*?: Audio: (\w+)")
+_FPS_RE = re.compile(r"([\d.]+) fps")
+_ROTATION_RE = re.compile(r"rotation of (-?[\d.]+) degrees")
+_CREATION_RE = re.compile(r"creation_time\s*: (\S+)")
+
+def _probe_with_ffmpeg(ffmpeg: str, path: Path) -> Optional[VideoMetadata]:
+    """Header-only probe for installs without ffprobe: parse `ffmpeg -i` output."""
+    result = subprocess.run([ffmpeg, "-hide_banner", "-i", str(path)],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    text = result.stderr.decode(errors="replace")
+    duration = _DURATION_RE.search(text)
+    video = _VIDEO_RE.search(text)
+    if not duration or not video:
+        return None
+
+    hours, minutes, seconds = duration.groups()
+    metadata = VideoMetadata(
+        duration=int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+        codec=video.group(1),
+        width=int(video.group(2)),
+        height=int(video.group(3)),
+    )
+    video_line = text[video.start():text.find("\n", video.start())]
+    fps = _FPS_RE.search(video_line)
+    metadata.frame_rate = float(fps.group(1)) if fps else None
+    audio = _AUDIO_RE.search(text)
+    metadata.audio_codec = audio.group(1) if audio else None
+    rotation = _ROTATION_RE.search(text)
+    metadata.rotation = int(round(float(rotation.group(1)))) % 360 if rotation else 0
+    creation = _CREATION_RE.search(text)
+    metadata.creation_time = _parse_creation_time(creation.group(1) if creation else None)
+    return metadata
+
+def get_video_metadata(path: Path) -> VideoMetadata:
+    """Probe a video's container and stream headers without decoding any frames.
 
+    Uses ffprobe when available and falls back to parsing `ffmpeg -i`.
+    Returns an empty VideoMetadata (duration None) if the file cannot be probed.
+    """
     try:
-        # Use ffprobe to get detailed metadata
-        cmd = [
-            "ffprobe",
-            "-v", "quiet",
-            "-print_format", "json",
-            "-show_format",
-            "-show_streams",
-            str(path)
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-
-            for stream in data.get('streams', []):
-                if stream['codec_type'] == 'video':
-                    metadata.codec = stream.get('codec_name')
-                    metadata.width = stream.get('width')
-                    metadata.height = stream.get('height')
-                    metadata.frame_rate = eval(stream.get('r_frame_rate', '0'))
-                    metadata.bit_rate = int(stream.get('bit_rate', 0))
-                elif stream['codec_type'] == 'audio':
-                    metadata.audio_codec = stream.get('codec_name')
-
-            fmt = data.get("format", {})
-            metadata.duration = float(fmt.get('duration', 0))
-            metadata.other_metadata = fmt
+        ffprobe = get_ffprobe_path()
+        metadata = _probe_with_ffprobe(ffprobe, path) if ffprobe else None
+        if metadata is None:
+            ffmpeg = get_ffmpeg_path()
+            metadata = _probe_with_ffmpeg(ffmpeg, path) if ffmpeg else None
+        if metadata is not None:
+            return metadata
     except Exception as e:
         print(f"Error reading video metadata: {e}")
-    return metadata
-
+    return VideoMetadata()
 
 def get_meta_data(file_path: str) -> MediaMetadata:
     path = Path(file_path)
@@ -0,0 +1,59 @@
+"""
+Pre-rendered background music bed.
+The music track is looped to the video length, gain-adjusted and faded in
+and out by one ffmpeg pass into a PCM WAV file, cached under
+<cache_dir>/music/ by (music file, duration, settings). Encoders then only
+mix the finished bed under the clip audio.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from utils.ffmpegHelper import run_ffmpeg
+from utils.ingestCache import file_key
+
+MUSIC_DIRNAME = "music"
+
+# Bump when the bed rendering changes so cached beds are rebuilt.
+MUSIC_BED_VERSION = 1
+
+
+def music_bed_key(music_file, duration, volume, fade_in, fade_out, audio_fps):
+    payload = json.dumps([MUSIC_BED_VERSION, file_key(music_file), round(duration, 3),
+                          volume, fade_in, fade_out, audio_fps])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def render_music_bed(music_file, duration, output_dir, volume=0.2, fade_in=0.0, fade_out=0.0,
+                     audio_fps=44100):
+    """Return a stereo WAV of music_file looped to duration seconds with gain and fades applied.
+
+    The file is named by music_bed_key inside output_dir, so an unchanged
+    bed is reused instead of rendered again.
+    """
+    bed_dir = os.path.join(output_dir, MUSIC_DIRNAME)
+    bed_file = os.path.join(
+        bed_dir, music_bed_key(music_file, duration, volume, fade_in, fade_out, audio_fps) + ".wav")
+    if os.path.exists(bed_file):
+        return bed_file
+
+    os.makedirs(bed_dir, exist_ok=True)
+    filters = [f"volume={volume}"]
+    if fade_in > 0:
+        filters.append(f"afade=t=in:st=0:d={fade_in}")
+    if fade_out > 0:
+        filters.append(f"afade=t=out:st={max(0.0, duration - fade_out):.3f}:d={fade_out}")
+    # Batch renders of several projects share the cache dir from threads of one process
+    temp_file = f"{os.path.splitext(bed_file)[0]}.{os.getpid()}.{threading.get_ident()}.tmp.wav"
+    run_ffmpeg([
+        "-stream_loop", "-1", "-i", music_file,
+        "-t", f"{duration:.3f}",
+        "-af", ",".join(filters),
+        "-ar", str(audio_fps), "-ac", "2",
+        "-c:a", "pcm_s16le",
+        temp_file,
+    ])
+    os.replace(temp_file, bed_file)
+    return bed_file
@@ -0,0 +1,152 @@
+"""
+Optional pipeline profiling.
+When enabled, stages and files record timed spans that are written as a
+Chrome trace (chrome://tracing, https://ui.perfetto.dev), together with
+peak RSS and child-process counters and a summary of the slowest files.
+Disabled, every hook is a no-op.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import psutil
+    PSUTIL_SUPPORTED = True
+except ImportError:
+    PSUTIL_SUPPORTED = False
+
+_tracer = None
+
+
+def now_us():
+    """Wall-clock microseconds; comparable between the main process and pool workers."""
+    return time.time_ns() // 1000
+
+
+def process_stats():
+    """Peak RSS of this process and its children (MB) and the number of live child processes."""
+    stats = {}
+    if PSUTIL_SUPPORTED:
+        proc = psutil.Process()
+        memory = proc.memory_info()
+        stats["peak_rss_mb"] = getattr(memory, "peak_wset", memory.rss) / 2**20
+        stats["children"] = len(proc.children(recursive=True))
+    try:
+        import resource
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        unit = 1 if sys.platform == "darwin" else 1024
+        stats["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20
+        stats["children_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2**20
+    except ImportError:
+        pass
+    if "children" not in stats and os.path.isdir("/proc/self/task"):
+        count = 0
+        for task in os.listdir("/proc/self/task"):
+            try:
+                with open(f"/proc/self/task/{task}/children") as f:
+                    count += len(f.read().split())
+            except OSError:
+                pass
+        stats["children"] = count
+    return stats
+
+
+class Tracer:
+    """Collects Chrome trace events for one run."""
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def complete(self, name, cat, start_us, dur_us, pid=None, tid=None, args=None):
+        """Record a finished span ("X" event)."""
+        event = {"name": name, "cat": cat, "ph": "X", "ts": start_us, "dur": dur_us,
+                 "pid": pid or self.pid, "tid": tid or threading.get_ident() % 2**31}
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    def counters(self):
+        """Record the current process stats as counter ("C") events."""
+        ts = now_us()
+        with self.lock:
+            for name, value in process_stats().items():
+                self.events.append({"name": name, "ph": "C", "ts": ts, "pid": self.pid,
+                                    "args": {name: round(value, 1)}})
+
+    def slowest(self, cat="file", top_n=20):
+        spans = [e for e in self.events if e["ph"] == "X" and e["cat"] == cat]
+        return sorted(spans, key=lambda e: e["dur"], reverse=True)[:top_n]
+
+    def stage_totals(self):
+        totals = {}
+        for e in self.events:
+            if e["ph"] == "X" and e["cat"] == "stage":
+                totals[e["name"]] = totals.get(e["name"], 0) + e["dur"]
+        return totals
+
+    def write(self, path, top_n=20):
+        """Write the trace JSON and print the stage totals and the top_n slowest files."""
+        self.counters()
+        slowest = self.slowest("file", top_n)
+        summary = {
+            "stages_seconds": {name: dur / 1e6 for name, dur in self.stage_totals().items()},
+            "slowest_files": [{"file": e["args"]["file"], "seconds": e["dur"] / 1e6, "stage": e["name"]}
+                              for e in slowest],
+            "process": process_stats(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms", "otherData": summary}, f)
+
+        print(f"\n--- Profile ({path}) ---")
+        for name, seconds in sorted(summary["stages_seconds"].items(), key=lambda kv: -kv[1]):
+            print(f"{seconds:9.2f}s  {name}")
+        if slowest:
+            print(f"Slowest {len(slowest)} files:")
+            for entry in summary["slowest_files"]:
+                print(f"{entry['seconds']:9.2f}s  {entry['stage']:<22} {entry['file']}")
+        for name, value in summary["process"].items():
+            print(f"{name}: {value:.1f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+def enable_profiling():
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+@contextmanager
+def span(name, cat="stage", **args):
+    """Time the enclosed block as a span; stage spans also sample the process counters."""
+    if _tracer is None:
+        yield
+        return
+    start = now_us()
+    try:
+        yield
+    finally:
+        _tracer.complete(name, cat, start, now_us() - start, args=args or None)
+        if cat == "stage":
+            _tracer.counters()
+
+
+def record_span(name, cat, start_us, dur_us, pid, **args):
+    """Record a span measured elsewhere, e.g. in a pool worker that reported its timings."""
+    if _tracer is not None:
+        _tracer.complete(name, cat, start_us, dur_us, pid=pid, tid=pid, args=args or None)
+
+
+def profiled(func):
+    """Decorator: record each call of func as a stage span."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
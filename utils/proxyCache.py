@@ -0,0 +1,130 @@
+"""
+Proxy media for draft renders.
+Each source video is transcoded once into a small, fast-decoding H.264 file
+(PROXY_HEIGHT lines, short GOP, ultrafast preset) kept in <cache_dir>/proxies/
+and indexed in SQLite by the source's content hash, so renamed or copied
+sources reuse the same proxy. Preview renders read proxies; final renders
+always read the originals.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.ffmpegHelper import run_ffmpeg
+from utils.renderCache import open_hash_db, cached_content_hash
+
+INDEX_FILENAME = "proxy_index.sqlite"
+PROXY_DIRNAME = "proxies"
+PROXY_HEIGHT = 540  # at or above every preview height, so previews only ever downscale
+PROXY_GOP = 15  # short keyframe interval keeps seeks cheap
+
+# Bump when the proxy encoding changes so old proxies are rebuilt.
+PROXY_VERSION = 1
+
+
+def transcode_proxy(source, proxy_file, height=PROXY_HEIGHT):
+    """Transcode one video to a proxy; ffmpeg applies the rotation, so the proxy is upright."""
+    # Unique per thread: several transcodes (and batch projects) run as threads of one process
+    temp_file = f"{os.path.splitext(proxy_file)[0]}.{os.getpid()}.{threading.get_ident()}.tmp.mp4"
+    run_ffmpeg([
+        "-i", source,
+        # Never upscale; -2 keeps the width even for yuv420p
+        "-vf", f"scale=-2:'min({height},ih)'",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "23", "-g", str(PROXY_GOP),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+        temp_file,
+    ])
+    os.replace(temp_file, proxy_file)
+
+
+class ProxyCache:
+    """Index of proxy files keyed by source content hash."""
+
+    def __init__(self, cache_dir):
+        self.proxy_dir = os.path.join(cache_dir, PROXY_DIRNAME)
+        os.makedirs(self.proxy_dir, exist_ok=True)
+        self.conn = open_hash_db(os.path.join(cache_dir, INDEX_FILENAME))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS proxies ("
+            " sha1 TEXT NOT NULL,"
+            " height INTEGER NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " file TEXT NOT NULL,"
+            " PRIMARY KEY (sha1, height))"
+        )
+        self.conn.commit()
+
+    def lookup(self, sha1, height=PROXY_HEIGHT):
+        """Return the proxy file for a source hash, or None if there is no usable one."""
+        row = self.conn.execute(
+            "SELECT version, file FROM proxies WHERE sha1 = ? AND height = ?", (sha1, height)
+        ).fetchone()
+        if row is None or row[0] != PROXY_VERSION or not os.path.exists(row[1]):
+            return None
+        return row[1]
+
+    def proxy_path(self, sha1, height=PROXY_HEIGHT):
+        return os.path.join(self.proxy_dir, f"{sha1}_{height}p.mp4")
+
+    def put(self, sha1, proxy_file, height=PROXY_HEIGHT):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO proxies (sha1, height, version, file) VALUES (?, ?, ?, ?)",
+            (sha1, height, PROXY_VERSION, proxy_file),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def attach_proxies(segments, cache_dir, jobs=4, height=PROXY_HEIGHT):
+    """Return segments whose video items carry a 'proxy_file', building missing proxies first.
+
+    Items are copied, not modified. Videos whose proxy cannot be built keep
+    using their original file.
+    """
+    cache = ProxyCache(cache_dir)
+    try:
+        videos = {}
+        for segment in segments:
+            for item in segment:
+                if item['type'] == "video" and item['file'] not in videos:
+                    videos[item['file']] = cached_content_hash(cache.conn, item['file'])
+
+        proxies, missing = {}, {}
+        for path, sha1 in videos.items():
+            proxy = cache.lookup(sha1, height)
+            if proxy:
+                proxies[path] = proxy
+            elif sha1 not in missing:
+                missing[sha1] = path
+
+        def build(sha1):
+            proxy_file = cache.proxy_path(sha1, height)
+            try:
+                transcode_proxy(missing[sha1], proxy_file, height)
+                return sha1, proxy_file
+            except Exception as e:
+                print(f"Warning: Could not build proxy for {missing[sha1]}: {e}")
+                return sha1, None
+
+        if missing:
+            print(f"Building {len(missing)} proxies ({len(videos) - len(missing)} cached)")
+        # ffmpeg does the work, so threads are enough to keep several transcodes running
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            built = dict(executor.map(build, list(missing)))
+        for sha1, proxy_file in built.items():
+            if proxy_file:
+                cache.put(sha1, proxy_file, height)
+        for path, sha1 in videos.items():
+            if path not in proxies and built.get(sha1):
+                proxies[path] = built[sha1]
+    finally:
+        cache.close()
+
+    return [[{**item, "proxy_file": proxies[item['file']]} if item['file'] in proxies else item
+             for item in segment]
+            for segment in segments]
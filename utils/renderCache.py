@@ -0,0 +1,97 @@
+"""
+Persistent per-clip render cache.
+Each fully composed clip (fitted, letterboxed, subtitled) is encoded once to
+<cache_dir>/clips/<key>.mp4, where the key covers everything that affects its
+pixels and stream parameters: source content hash, subtitle text, target
+size, fps and encoder settings. Source content hashes are remembered in
+SQLite by path, size and mtime so unchanged files are not re-read.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+
+from utils.imageHelper import file_sha1
+from utils.ingestCache import file_key
+
+CACHE_FILENAME = "render_cache.sqlite"
+CLIP_DIRNAME = "clips"
+
+# Bump when clip composition changes so every cached clip is re-rendered.
+RENDER_VERSION = 3
+
+DB_TIMEOUT = 30.0  # seconds a writer waits for another process or thread holding the database
+
+
+def open_hash_db(db_path):
+    """Open (creating if needed) an SQLite file with a content-hash table.
+
+    Several renders may share a cache dir (see src/batch.py), so the file
+    is opened in WAL mode, writers wait for each other for up to
+    DB_TIMEOUT seconds, and every write is committed right away.
+    """
+    conn = sqlite3.connect(db_path, timeout=DB_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS hashes ("
+        " path TEXT PRIMARY KEY,"
+        " size INTEGER NOT NULL,"
+        " mtime_ns INTEGER NOT NULL,"
+        " sha1 TEXT NOT NULL)"
+    )
+    conn.commit()
+    return conn
+
+
+def cached_content_hash(conn, path):
+    """SHA-1 of a file's content, reusing the value stored in conn while size and mtime are unchanged."""
+    key_path, size, mtime_ns = file_key(path)
+    row = conn.execute(
+        "SELECT size, mtime_ns, sha1 FROM hashes WHERE path = ?", (key_path,)
+    ).fetchone()
+    if row is not None and row[0] == size and row[1] == mtime_ns:
+        return row[2]
+    digest = file_sha1(path)
+    conn.execute(
+        "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+        (key_path, size, mtime_ns, digest),
+    )
+    conn.commit()
+    return digest
+
+
+class RenderCache:
+    """Content-addressed store of rendered clip files."""
+
+    def __init__(self, cache_dir):
+        self.clip_dir = os.path.join(cache_dir, CLIP_DIRNAME)
+        os.makedirs(self.clip_dir, exist_ok=True)
+        self.conn = open_hash_db(os.path.join(cache_dir, CACHE_FILENAME))
+        self.hits = 0
+        self.misses = 0
+
+    def content_hash(self, path):
+        return cached_content_hash(self.conn, path)
+
+    def clip_key(self, *parts):
+        """Stable key for a clip from JSON-serializable parts."""
+        payload = json.dumps([RENDER_VERSION, *parts], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def clip_path(self, key):
+        return os.path.join(self.clip_dir, key + ".mp4")
+
+    def lookup(self, key):
+        """Return (found, path) for a clip key and count the hit or miss."""
+        path = self.clip_path(key)
+        found = os.path.exists(path)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found, path
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
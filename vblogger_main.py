@@ -11,9 +11,79 @@ import argparse
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.pixPicker import process_media
-from src.composer import build_video
+# Only light modules are imported here. The media stages (OpenCV, PIL,
+# moviepy) are imported where they are used, so --list-configs, config
+# validation and --dry-run start quickly.
 from config.config_loader import load_config, list_available_configs, validate_config
+from config.settings import CACHE_DIR
+from src.timeline import render_settings, timeline_duration
+from utils.profiler import enable_profiling, span, now_us
+
+
+def prepare_segments(segments, config, args):
+    """Drop near-duplicate photos (unless disabled) and print the segment plan."""
+    if not args.keep_duplicates:
+        from utils.dedupHelper import remove_near_duplicates, DEDUP_MAX_DISTANCE, DEDUP_TIME_WINDOW
+        with span("remove_near_duplicates"):
+            segments = remove_near_duplicates(
+                segments, max_distance=config.get('DEDUP_MAX_DISTANCE', DEDUP_MAX_DISTANCE),
+                time_window=config.get('DEDUP_TIME_WINDOW', DEDUP_TIME_WINDOW))
+    totalCnt = 1
+    for i, segment in enumerate(segments):
+        print(f"\n--- Segment {i+1} ---")
+        for item in segment:            
+            print(f"{item['timestamp']} | {item['type'].upper()} | {item['file']}")
+            totalCnt += 1
+    print(f"\n--- {totalCnt} ---")
+    return segments
+
+
+def highlight_window(config, args):
+    """Seconds long videos are trimmed to, or None to keep them whole."""
+    return None if args.full_videos else config.get('VIDEO_DURATION')
+
+
+def render_job_count(args):
+    """Render workers asked for by --render-jobs (0 = all cores; default 1)."""
+    return (args.render_jobs or os.cpu_count() or 1) if args.render_jobs is not None else 1
+
+
+def render(segments, config, args, final_file, jobs, cache_dir, preview=False, executor=None):
+    """Build the video (or its *_preview draft) from the segment plan.
+
+    executor, a process pool of render_job_count(args) workers, is reused
+    for the moviepy render parts instead of starting a new pool.
+    """
+    from src.composer import build_video, report_render_speed, MAX_OPEN_VIDEOS
+    from utils.proxyCache import attach_proxies
+
+    render_jobs = render_job_count(args)
+    stats_key = os.path.abspath(final_file)  # the same for the final render and its preview
+    settings = render_settings(config, preview=preview)
+    window = highlight_window(config, args)
+    if window:
+        from utils.highlightPicker import attach_highlights
+        # Long videos become their best VIDEO_DURATION-second window
+        with span("attach_highlights"):
+            segments = attach_highlights(segments, window, cache_dir, jobs=jobs)
+    if preview:
+        base, ext = os.path.splitext(final_file)
+        final_file = f"{base}_preview{ext}"
+        print(f"Preview mode: {settings.size[0]}x{settings.size[1]} at {settings.fps} fps -> {final_file}")
+        if cache_dir:
+            # Drafts decode small cached proxies instead of the full-resolution sources
+            with span("attach_proxies"):
+                segments = attach_proxies(segments, cache_dir, jobs=jobs)
+    video_seconds, elapsed, encoded_seconds = build_video(
+        segments, final_file, config['TITLE'], config['SUBTITLE'], config['MUSIC_FILE'], jobs=render_jobs,
+        cache_dir=cache_dir, backend=args.backend,
+        max_open_videos=config.get('MAX_OPEN_VIDEOS', MAX_OPEN_VIDEOS), settings=settings,
+        executor=executor if args.backend == "moviepy" else None)
+    # Rates are kept per output file, so the speedup compares renders of the same project
+    stats_file = os.path.join(cache_dir, "render_stats.json") if cache_dir else None
+    report_render_speed(stats_file, stats_key, preview, video_seconds, elapsed, encoded_seconds)
+
+    print(f"\n✅ Video created successfully: {final_file}")
 
 
 def main():
@@ -30,6 +100,48 @@ def main():
     parser.add_argument('--testing', '-t', 
                        action='store_true',
                        help='Run in testing mode')
+    parser.add_argument('--jobs', '-j',
+                       type=int,
+                       help='Worker processes for media ingestion (0 = all cores; default 1, all cores with --batch)')
+    parser.add_argument('--no-cache',
+                       action='store_true',
+                       help='Re-analyze and re-render everything instead of using the ingestion and render caches')
+    parser.add_argument('--render-jobs',
+                       type=int,
+                       help='Render segments as parallel jobs joined without re-encoding '
+                            '(0 = all cores; default 1, the --jobs pool size with --batch)')
+    parser.add_argument('--backend',
+                       choices=['moviepy', 'ffmpeg'],
+                       default='moviepy',
+                       help='Render with moviepy, or with a single native ffmpeg filtergraph')
+    parser.add_argument('--preview', '-p',
+                       action='store_true',
+                       help='Fast draft render (low resolution and fps, ultrafast preset) to *_preview.mp4')
+    parser.add_argument('--keep-duplicates',
+                       action='store_true',
+                       help='Keep near-duplicate photos (e.g. bursts) instead of only the sharpest')
+    parser.add_argument('--profile',
+                       nargs='?',
+                       const='vblogger_trace.json',
+                       metavar='TRACE_FILE',
+                       help='Record stage and per-file timings to a Chrome trace (default: vblogger_trace.json)')
+    parser.add_argument('--profile-top',
+                       type=int,
+                       default=20,
+                       help='Number of slowest files listed in the profile summary')
+    parser.add_argument('--watch', '-w',
+                       action='store_true',
+                       help='Keep running and re-render the preview whenever INPUT_FOLDER changes')
+    parser.add_argument('--batch', '-b',
+                       nargs='*',
+                       metavar='CONFIG',
+                       help='Render several configs (all of them if none are named) on shared worker pools')
+    parser.add_argument('--full-videos',
+                       action='store_true',
+                       help='Use videos in full instead of trimming them to a VIDEO_DURATION highlight')
+    parser.add_argument('--dry-run', '-n',
+                       action='store_true',
+                       help='Analyze the media and print the segment plan without rendering')
     
     args = parser.parse_args()
     
@@ -46,7 +158,18 @@ def main():
             traceback.print_exc()
         return
     
+    tracer = enable_profiling() if args.profile else None
+    started = now_us()
     try:
+        if args.batch is not None:
+            from src.batch import run_batch
+            # Pools shared by every project: all cores unless --jobs/--render-jobs ask for a number
+            projects = run_batch(args.batch or list_available_configs(), args,
+                                 jobs=args.jobs or None, render_jobs=args.render_jobs or None)
+            if any(project.error for project in projects):
+                sys.exit(1)
+            return
+
         # Load configuration
         if args.testing:
             print(f"Overriding configuration from {args.config} to temp_config")
@@ -81,23 +204,45 @@ def main():
         print(f"Music: {music}")
         
         # Process media
-        segments = process_media(folder)
-        totalCnt = 1
-        for i, segment in enumerate(segments):
-            print(f"\n--- Segment {i+1} ---")
-            for item in segment:            
-                print(f"{item['timestamp']} | {item['type'].upper()} | {item['file']}")
-                totalCnt += 1
-        print(f"\n--- {totalCnt} ---")
-
-        # Build video
-        build_video(segments, final_file, title, subtitle, music)
-        
-        print(f"\n✅ Video created successfully: {final_file}")
+        jobs = (args.jobs or os.cpu_count() or 1) if args.jobs is not None else 1
+        cache_dir = None if args.no_cache else config.get('CACHE_DIR', CACHE_DIR)
+        if args.watch:
+            from src.watcher import watch_folder, WATCH_DEBOUNCE, SCAN_DEPTH
+            # Warm process: re-ingest only what changed and re-render the preview
+            # on ingest and render pools that live as long as the watch
+            watch_folder(
+                folder,
+                lambda segments, executor: render(prepare_segments(segments, config, args), config, args,
+                                                  final_file, jobs, cache_dir, preview=True, executor=executor),
+                jobs=jobs, cache_dir=cache_dir, heic_cache_dir=config.get('HEIC_CACHE_DIR'),
+                debounce=config.get('WATCH_DEBOUNCE', WATCH_DEBOUNCE),
+                max_depth=config.get('SCAN_DEPTH', SCAN_DEPTH),
+                distance_km=config.get('SEGMENT_DISTANCE_KM'), time_gap=config.get('SEGMENT_TIME_GAP'),
+                render_jobs=render_job_count(args) if args.backend == "moviepy" else None,
+                max_open_videos=config.get('MAX_OPEN_VIDEOS'))
+            return
+        from src.pixPicker import process_media, SCAN_DEPTH
+        segments = process_media(folder, jobs=jobs, cache_dir=cache_dir,
+                                 heic_cache_dir=config.get('HEIC_CACHE_DIR'),
+                                 max_depth=config.get('SCAN_DEPTH', SCAN_DEPTH),
+                                 distance_km=config.get('SEGMENT_DISTANCE_KM'),
+                                 time_gap=config.get('SEGMENT_TIME_GAP'))
+        segments = prepare_segments(segments, config, args)
+        if args.dry_run:
+            settings = render_settings(config, preview=args.preview)
+            duration = timeline_duration(segments, settings, highlight_window(config, args))
+            print(f"Dry run: {len(segments)} segments, {duration:.1f}s of video "
+                  f"at {settings.size[0]}x{settings.size[1]} and {settings.fps} fps; nothing rendered")
+            return
+        render(segments, config, args, final_file, jobs, cache_dir, preview=args.preview)
         
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
+    finally:
+        if tracer is not None:
+            tracer.complete("main", "stage", started, now_us() - started)
+            tracer.write(args.profile, top_n=args.profile_top)
 
 
 if __name__ == "__main__":